@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Místní kopie šablon a fontů ze sdíleného disku N:.
+Čte se vždy z lokálního disku v profilu uživatele; vlákno na pozadí podle
+velikosti a mtime ověřuje, zda se soubor na N: nezměnil, a případně ho
+stáhne znovu. Když N: není dostupný (spadlá VPN), platí poslední dobrá kopie.
+"""
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+
+MANIFEST = "manifest.json"
+
+
+def default_cache_dir() -> str:
+    """%LOCALAPPDATA%\\ID_card_tool\\assets, mimo Windows ~/.cache/ID_card_tool/assets."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ID_card_tool", "assets")
+
+
+class AssetMirror:
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.offline = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._events = queue.Queue()  # (stav, cesta) pro hlavní vlákno
+        # sdílená cesta -> {"local": jméno souboru, "size": …, "mtime_ns": …} podle N:
+        self._entries: dict[str, dict] = {}
+        try:
+            with open(os.path.join(cache_dir, MANIFEST), "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _local_name(path: str) -> str:
+        # stejné jméno souboru může být v různých složkách N:
+        digest = hashlib.blake2b(path.encode("utf-8"), digest_size=6).hexdigest()
+        return f"{digest}_{os.path.basename(path)}"
+
+    def local(self, path: str) -> str:
+        """Cesta, ze které se má soubor číst.
+
+        Známý soubor se vrací z místní kopie bez přístupu na N:, neznámý se
+        stáhne hned. Bez kopie a bez N: vrátí původní cestu, aby chybu
+        ohlásil ten, kdo soubor čte.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None:
+            local = os.path.join(self.cache_dir, entry["local"])
+            if os.path.exists(local):
+                return local
+        try:
+            return self._fetch(path, None)
+        except OSError:
+            return path
+
+    def _fetch(self, path: str, entry: dict | None) -> str:
+        """Stáhne soubor, pokud se na N: liší od kopie. OSError = N: nedostupný."""
+        st = os.stat(path)
+        name = self._local_name(path)
+        local = os.path.join(self.cache_dir, name)
+        if (entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+                and os.path.exists(local)):
+            return local
+        part = f"{local}.{os.getpid()}.part"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            shutil.copy2(path, part)  # copy2 zachová mtime z N:, renderer tak pozná změnu
+            if os.path.getsize(part) != st.st_size:
+                raise OSError(f"neúplná kopie: {path}")
+            os.replace(part, local)
+        except OSError:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            if os.path.exists(local):
+                return local  # zkusí se při další kontrole
+            raise
+        with self._lock:
+            self._entries[path] = {"local": name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            self._save()
+        if entry is not None:
+            self._events.put(("updated", path))
+        return local
+
+    def _save(self):
+        manifest = os.path.join(self.cache_dir, MANIFEST)
+        part = f"{manifest}.{os.getpid()}.part"
+        try:
+            with open(part, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            os.replace(part, manifest)
+        except OSError:
+            pass  # kopie fungují i bez manifestu, jen se příště stáhnou znovu
+
+    def refresh(self) -> int:
+        """Ověří všechny známé soubory proti N:; vrací počet nedostupných."""
+        with self._lock:
+            entries = dict(self._entries)
+        failed = 0
+        for path, entry in entries.items():
+            if self._stop.is_set():
+                break
+            try:
+                self._fetch(path, entry)
+            except OSError:
+                failed += 1
+        offline = bool(entries) and failed == len(entries)
+        if offline != self.offline:
+            self.offline = offline
+            self._events.put(("offline" if offline else "online", self.cache_dir))
+        return failed
+
+    def events(self) -> list[tuple[str, str]]:
+        out = []
+        try:
+            while True:
+                out.append(self._events.get_nowait())
+        except queue.Empty:
+            return out
+
+    def start(self, interval_s: float):
+        """Kontrola na pozadí hned a pak každých interval_s sekund (0 = jen při startu)."""
+        def run():
+            while True:
+                self.refresh()
+                if not interval_s or self._stop.wait(interval_s):
+                    return
+        self._thread = threading.Thread(target=run, name="assets", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Měření rychlosti řetězce ořez → karta → zápis bez okna a bez disku N:.
+Každý krok (dekódování, detekce, ořez, karta, náhled, PNG, zápis) se měří
+zvlášť na syntetických nebo vzorových fotkách v rozlišeních 2–48 Mpx
+a výsledek lze porovnat s uloženou základnou.
+
+Použití:
+    python bench.py --save-baseline                # uloží bench_baseline.json
+    python bench.py --photos vzorky --repeat 10    # porovná se základnou, při zpomalení vrátí 1
+    python bench.py --photos vzorky --backends haar,lbp,yunet   # porovná detektory
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+from typing import Callable
+import cv2
+import numpy as np
+from PIL import Image
+
+from card_render import CardRenderer
+from face_detect import (BACKENDS, DETECT_CHAIN, configure_yunet, crop_region, detect_face, detect_face_chain,
+                         square_crop_region)
+from image_io import load_scaled
+from output_writer import encode_image, write_atomic
+
+STAGES = ("decode", "detect", "crop", "render", "preview", "encode", "write")
+PIPELINE = ("decode", "detect", "crop", "render", "encode", "write")  # co proběhne při uložení fotky
+DEFAULT_SIZES = (2, 12, 24, 48)
+FONT_CANDIDATES = (
+    "C:/Windows/Fonts/arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_detect_settings() -> dict:
+    """Nastavení detekce z config.json vedle skriptu (cesty na N: se nepoužijí)."""
+    try:
+        with open(os.path.join(BASE_DIR, "config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    configure_yunet(config.get("yunet_model", ""), config.get("yunet_score", 0.8))
+    return {
+        "max_side": config.get("detect_max_side", 0),
+        "refine": config.get("detect_refine", True),
+        "chain": config.get("detect_chain", list(DETECT_CHAIN)),
+        "budget_ms": config.get("detect_budget_ms", 1500),
+        "backend": config.get("detector_backend", "haar"),
+        "font_path": config.get("font_path", ""),
+    }
+
+
+def photo_dims(megapixels: float, aspect: float = 4 / 3) -> tuple[int, int]:
+    w = int(round((megapixels * 1e6 * aspect) ** 0.5))
+    return w, int(round(w / aspect))
+
+
+def make_synthetic_photo(megapixels: float, seed: int = 0) -> np.ndarray:
+    """Fotka bez obličeje s texturou podobnou snímku z fotoaparátu.
+    Detekce na ní projde celý záložní řetězec – měří se nejhorší případ."""
+    w, h = photo_dims(megapixels)
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)  # hrubé skvrny, na kterých kaskády nic nenajdou
+    img = cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-12, 13, (h, w, 1), dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def resample_photo(img: np.ndarray, megapixels: float) -> np.ndarray:
+    h, w = img.shape[:2]
+    ratio = (megapixels * 1e6 / (w * h)) ** 0.5
+    size = (int(round(w * ratio)), int(round(h * ratio)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_CUBIC)
+
+
+def prepare_inputs(sizes: list[float], photos_dir: str | None, work_dir: str) -> dict[str, list[str]]:
+    """JPEG soubory pro každé rozlišení: vzorové fotky převzorkované, jinak syntetické."""
+    samples = []
+    if photos_dir:
+        for name in sorted(os.listdir(photos_dir)):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                img = cv2.imread(os.path.join(photos_dir, name))
+                if img is not None:
+                    samples.append((os.path.splitext(name)[0], img))
+        if not samples:
+            raise SystemExit(f"[CHYBA] Ve složce {photos_dir} nejsou žádné fotky")
+
+    inputs = {}
+    for mp in sizes:
+        label = f"{mp:g}MP"
+        paths = []
+        sources = [(n, resample_photo(img, mp)) for n, img in samples] or [("synt", make_synthetic_photo(mp))]
+        for name, img in sources:
+            path = os.path.join(work_dir, f"{name}_{label}.jpg")
+            cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+            paths.append(path)
+        inputs[label] = paths
+    return inputs
+
+
+def make_template(path: str):
+    """Jednoduchá šablona ve velikosti skutečných karet (330×210)."""
+    template = np.full((210, 330, 3), 255, np.uint8)
+    cv2.rectangle(template, (0, 0), (329, 209), (90, 60, 20), 4)
+    cv2.rectangle(template, (0, 180), (329, 209), (200, 150, 60), -1)
+    cv2.imwrite(path, template)
+
+
+def find_font(preferred: str | None) -> str | None:
+    for path in (preferred, *FONT_CANDIDATES):
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+# === Měření ===
+def timed(samples: dict[str, list[float]], stage: str, fn: Callable, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    samples.setdefault(stage, []).append((time.perf_counter() - t0) * 1000)
+    return result
+
+
+def bench_file(path: str, settings: dict, renderer: CardRenderer | None, template: str,
+               out_dir: str, iteration: int, samples: dict[str, list[float]], detections: dict[str, int]):
+    img, _ = timed(samples, "decode", load_scaled, path, settings["max_side"])
+    det = timed(samples, "detect", detect_face_chain, img, settings["max_side"], settings["refine"],
+                settings["chain"], settings["budget_ms"], settings["backend"])
+    detections[det.stage or "nenalezen"] = detections.get(det.stage or "nenalezen", 0) + 1
+    face = det.face
+    if face is None:
+        # bez obličeje ořízneme střed, aby se zbytek řetězce měřil stejně
+        side = min(img.shape[:2]) // 3
+        face = ((img.shape[1] - side) // 2, (img.shape[0] - side) // 2, side, side)
+    crop = timed(samples, "crop", lambda: crop_region(img, square_crop_region(face, img.shape[1], img.shape[0])))
+
+    crop_path = os.path.join(out_dir, "crop.png")
+    if renderer is not None:
+        # jiný text v každém kole – měří se i rastrování nových textových vrstev;
+        # náhled pak vykresluje stejný formulář znovu (vrstvy z cache) a převádí ho pro Tk
+        card = timed(samples, "render", renderer.render, crop, "Jana", f"Nováková {iteration}",
+                     "Oddělení informatiky", "Lékař", f"{10000 + iteration}", template)
+        timed(samples, "preview", lambda: Image.fromarray(cv2.cvtColor(
+            renderer.render(crop, "Jana", f"Nováková {iteration}", "Oddělení informatiky", "Lékař",
+                            f"{10000 + iteration}", template), cv2.COLOR_BGR2RGB)))
+        card_path = os.path.join(out_dir, "card_ID.png")
+        data = timed(samples, "encode", lambda: (encode_image(crop_path, crop), encode_image(card_path, card)))
+        timed(samples, "write", lambda: (write_atomic(crop_path, data[0]), write_atomic(card_path, data[1])))
+    else:
+        data = timed(samples, "encode", encode_image, crop_path, crop)
+        timed(samples, "write", write_atomic, crop_path, data)
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p90": float(np.percentile(arr, 90)),
+        "p99": float(np.percentile(arr, 99)),
+        "max": float(arr.max()),
+    }
+
+
+def run(sizes: list[float], photos_dir: str | None, repeat: int, warmup: int, font_path: str | None) -> dict:
+    settings = load_detect_settings()
+    work_dir = tempfile.mkdtemp(prefix="idbench_")
+    try:
+        template = os.path.join(work_dir, "template.png")
+        make_template(template)
+        font = find_font(font_path or settings["font_path"])
+        renderer = CardRenderer(font) if font else None
+        if renderer is None:
+            print("[WARN] Nenalezen žádný font – karta, náhled se neměří (zadejte --font)")
+        inputs = prepare_inputs(sizes, photos_dir, work_dir)
+
+        results = {}
+        for label, paths in inputs.items():
+            samples: dict[str, list[float]] = {}
+            detections: dict[str, int] = {}
+            for i in range(warmup):
+                bench_file(paths[0], settings, renderer, template, work_dir, -1 - i, {}, {})
+            for i in range(repeat):
+                for path in paths:
+                    bench_file(path, settings, renderer, template, work_dir, i, samples, detections)
+            stages = {stage: summarize(samples[stage]) for stage in STAGES if stage in samples}
+            total = sum(stages[s]["mean"] for s in PIPELINE if s in stages)
+            results[label] = {
+                "stages": stages,
+                "photos_per_s": 1000.0 / total if total else 0.0,
+                "detections": detections,
+            }
+            print_size(label, results[label])
+        return {
+            "meta": {
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "host": platform.node(),
+                "python": platform.python_version(),
+                "opencv": cv2.__version__,
+                "cpu_count": os.cpu_count(),
+                "photos": photos_dir or "syntetické",
+                "repeat": repeat,
+                "detect": {k: v for k, v in settings.items() if k != "font_path"},
+            },
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_size(label: str, result: dict):
+    print(f"\n=== {label}: {result['photos_per_s']:.2f} fotek/s "
+          f"(detekce: {', '.join(f'{k} {v}×' for k, v in result['detections'].items())}) ===")
+    print(f"{'krok':<10}{'průměr':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}   [ms]")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<10}{s['mean']:>10.2f}{s['p50']:>10.2f}{s['p90']:>10.2f}{s['p99']:>10.2f}{s['max']:>10.2f}")
+
+
+# === Porovnání detektorů ===
+def compare_backends(photos_dir: str, backends: list[str], repeat: int, warmup: int) -> dict:
+    """Jen primární detektor (bez záložního řetězce) na každé vzorové fotce:
+    detekce za sekundu a podíl fotek, na kterých obličej nenašel."""
+    settings = load_detect_settings()
+    photos = []
+    for name in sorted(os.listdir(photos_dir)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            img, _ = load_scaled(os.path.join(photos_dir, name), settings["max_side"])
+            if img is not None:
+                photos.append((name, img))
+    if not photos:
+        raise SystemExit(f"[CHYBA] Ve složce {photos_dir} nejsou žádné fotky")
+
+    results = {}
+    for backend in backends:
+        try:
+            for _ in range(max(1, warmup)):  # první průchod odhalí chybějící model
+                detect_face(photos[0][1], settings["max_side"], settings["refine"], backend)
+        except (RuntimeError, ValueError, OSError, cv2.error) as e:
+            print(f"[WARN] {backend}: {e}")
+            continue
+        samples: list[float] = []
+        missed = []
+        for name, img in photos:
+            for i in range(repeat):
+                t0 = time.perf_counter()
+                face = detect_face(img, settings["max_side"], settings["refine"], backend)
+                samples.append((time.perf_counter() - t0) * 1000)
+            if face is None:
+                missed.append(name)
+        stats = summarize(samples)
+        results[backend] = {
+            "detect": stats,
+            "per_s": 1000.0 / stats["mean"] if stats["mean"] else 0.0,
+            "miss_rate": len(missed) / len(photos),
+            "missed": missed,
+        }
+
+    print(f"\n=== Detektory na {len(photos)} fotkách z {photos_dir} (max_side {settings['max_side']}, "
+          f"refine {settings['refine']}) ===")
+    print(f"{'detektor':<10}{'detekcí/s':>10}{'p50':>10}{'p90':>10}{'nenalezeno':>12}")
+    for backend, r in results.items():
+        print(f"{backend:<10}{r['per_s']:>10.1f}{r['detect']['p50']:>10.2f}{r['detect']['p90']:>10.2f}"
+              f"{r['miss_rate'] * 100:>11.1f} %" + (f"   ({', '.join(r['missed'])})" if r["missed"] else ""))
+    if results:
+        # nejrychlejší z těch, které minuly nejméně fotek
+        fewest = min(r["miss_rate"] for r in results.values())
+        best = max((b for b, r in results.items() if r["miss_rate"] == fewest), key=lambda b: results[b]["per_s"])
+        print(f"\n[OK] Doporučení: \"detector_backend\": \"{best}\"")
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "host": platform.node(),
+            "opencv": cv2.__version__,
+            "photos": photos_dir,
+            "repeat": repeat,
+        },
+        "backends": results,
+    }
+
+
+# === Porovnání se základnou ===
+def compare(current: dict, baseline: dict, threshold: float, min_ms: float) -> list[str]:
+    """Kroky, jejichž medián je o víc než threshold (a aspoň o min_ms) pomalejší než v základně."""
+    regressions = []
+    print(f"\n=== Porovnání se základnou z {baseline['meta'].get('created', '?')} "
+          f"(práh +{threshold * 100:.0f} %, min. {min_ms:g} ms) ===")
+    for label, result in current["results"].items():
+        base = baseline["results"].get(label)
+        if base is None:
+            continue
+        for stage, s in result["stages"].items():
+            b = base["stages"].get(stage)
+            if b is None:
+                continue
+            delta = s["p50"] - b["p50"]
+            ratio = delta / b["p50"] if b["p50"] else 0.0
+            slower = ratio > threshold and delta > min_ms
+            mark = "ZPOMALENÍ" if slower else ("zrychlení" if ratio < -threshold and -delta > min_ms else "")
+            print(f"{label:<7}{stage:<10}{b['p50']:>10.2f} → {s['p50']:>8.2f} ms  {ratio * 100:+6.1f} %  {mark}")
+            if slower:
+                regressions.append(f"{label} {stage}: {b['p50']:.2f} → {s['p50']:.2f} ms ({ratio * 100:+.0f} %)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Měření rychlosti ořezu a tvorby karet (bez okna).")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="rozlišení v Mpx oddělená čárkou")
+    parser.add_argument("--photos", metavar="DIR", help="vzorové fotky (jinak syntetické snímky)")
+    parser.add_argument("--repeat", type=int, default=5, help="počet opakování na fotku")
+    parser.add_argument("--warmup", type=int, default=1, help="zahřívací kola, která se nepočítají")
+    parser.add_argument("--font", help="TTF/OTF font pro kartu (výchozí font_path z config.json nebo systémový)")
+    parser.add_argument("--baseline", default=os.path.join(BASE_DIR, "bench_baseline.json"),
+                        help="soubor se základnou")
+    parser.add_argument("--save-baseline", action="store_true", help="uložit výsledek jako novou základnu")
+    parser.add_argument("--threshold", type=float, default=0.15, help="povolené zpomalení mediánu (0.15 = 15 %%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="menší rozdíly se považují za šum")
+    parser.add_argument("--json", metavar="PATH", help="uložit výsledky i sem")
+    parser.add_argument("--backends", metavar="LIST",
+                        help="místo řetězce porovnat detektory oddělené čárkou (" + ", ".join(BACKENDS)
+                             + ") na fotkách z --photos")
+    args = parser.parse_args(argv)
+
+    if args.backends:
+        if not args.photos:
+            parser.error("--backends potřebuje vzorové fotky s obličeji (--photos)")
+        current = compare_backends(args.photos, [b.strip() for b in args.backends.split(",") if b.strip()],
+                                   args.repeat, args.warmup)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(current, f, ensure_ascii=False, indent=2)
+        return 0
+
+    sizes = [float(s) for s in args.sizes.split(",") if s.strip()]
+    current = run(sizes, args.photos, args.repeat, args.warmup, args.font)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"\n[OK] Základna uložena: {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        print(f"\n[INFO] Základna {args.baseline} neexistuje – uložte ji přes --save-baseline")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.threshold, args.min_ms)
+    if regressions:
+        print(f"\n[CHYBA] Zpomalení v {len(regressions)} krocích:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\n[OK] Bez zpomalení oproti základně")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Vykreslování ID karet.
+Šablony a fonty se načítají jednou a drží v paměti; na disku (N: nebo jeho
+místní kopie, viz asset_mirror) se jen občas ověří mtime, aby se změněná
+šablona nebo font načetly znovu.
+Podklad karty a jednotlivé texty se cachují jako samostatné vrstvy.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+
+# pozice textů v souřadnicích šablony: (pole, (x, y), velikost písma)
+TEXT_LAYOUT = (
+    ("full_name", (15, 8), 22),
+    ("department", (15, 33), 16),
+    ("position", (180, 70), 16),
+    ("personal_label", (180, 90), 16),
+    ("personal_number", (235, 90), 16),
+)
+
+
+class CardRenderer:
+    """Karta se skládá z vrstev: podklad (šablona + fotka) a samostatná vrstva
+    pro každé textové pole. Při psaní se znovu rastrují jen změněná pole
+    a texty se do podkladu míchají přímo v jeho rozlišení."""
+
+    upscale = 2
+
+    def __init__(self, font_path: str, revalidate_s: float = 5.0, max_layers: int = 256,
+                 resolve: Callable[[str], str] | None = None):
+        self.font_path = font_path
+        # cesta na N: -> soubor, ze kterého se opravdu čte (místní kopie)
+        self.resolve = resolve or (lambda path: path)
+        self.revalidate_s = revalidate_s
+        self.max_layers = max_layers
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()  # vrstvy sdílí náhled i ukládání
+        self._templates: dict[str, tuple[float, np.ndarray]] = {}
+        self._fonts: dict[int, ImageFont.FreeTypeFont] = {}
+        self._font_data: bytes | None = None
+        self._font_mtime: float | None = None
+        self._checked: dict[str, float] = {}
+        self._bases: OrderedDict = OrderedDict()
+        self._text_layers: OrderedDict = OrderedDict()
+        self.stats = {"base_hits": 0, "base_misses": 0, "text_hits": 0, "text_misses": 0}
+
+    def _changed(self, path: str, cached_mtime: float | None) -> tuple[bool, float | None]:
+        """Ověří mtime nejvýš jednou za revalidate_s sekund."""
+        now = time.monotonic()
+        if cached_mtime is not None and now - self._checked.get(path, 0.0) < self.revalidate_s:
+            return False, cached_mtime
+        self._checked[path] = now
+        try:
+            mtime = os.stat(self.resolve(path)).st_mtime
+        except OSError:
+            # share je nedostupný – pokud něco máme, použijeme to
+            return cached_mtime is None, cached_mtime
+        return mtime != cached_mtime, mtime
+
+    def _pristine(self, template_file: str) -> tuple[float | None, np.ndarray]:
+        with self._lock:
+            cached = self._templates.get(template_file)
+            changed, mtime = self._changed(template_file, cached[0] if cached else None)
+            if changed or cached is None:
+                template = cv2.imread(self.resolve(template_file))
+                if template is None:
+                    if cached is not None:
+                        return cached
+                    raise FileNotFoundError(f"Šablona nenalezena: {template_file}")
+                template.flags.writeable = False
+                cached = (mtime, template)
+                self._templates[template_file] = cached
+            return cached
+
+    def template(self, template_file: str) -> np.ndarray:
+        """Kopie šablony, kterou lze volně přepisovat."""
+        return self._pristine(template_file)[1].copy()
+
+    def font(self, size: int) -> ImageFont.FreeTypeFont:
+        with self._lock:
+            changed, mtime = self._changed(self.font_path, self._font_mtime)
+            if changed:
+                # font se drží v paměti: FreeType by jinak nechal soubor otevřený
+                # a Windows by místní kopii nedovolily přepsat novější verzí
+                with open(self.resolve(self.font_path), "rb") as f:
+                    self._font_data = f.read()
+                self._fonts.clear()
+                self._text_layers.clear()
+                self._font_mtime = mtime
+            font = self._fonts.get(size)
+            if font is None:
+                font = ImageFont.truetype(io.BytesIO(self._font_data), size)
+                self._fonts[size] = font
+            return font
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, limit: int):
+        cache[key] = value
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def _base_layer(self, photo: np.ndarray, template_file: str) -> np.ndarray:
+        """Šablona s fotkou (jen pro čtení)."""
+        mtime, pristine = self._pristine(template_file)
+        key = (template_file, mtime, hashlib.blake2b(np.ascontiguousarray(photo).data, digest_size=16).digest())
+        base = self._bases.get(key)
+        if base is not None:
+            self._bases.move_to_end(key)
+            self.stats["base_hits"] += 1
+            return base
+        self.stats["base_misses"] += 1
+
+        base = pristine.copy()
+        base[55:55+125, 15:15+125] = photo
+        base.flags.writeable = False
+        self._remember(self._bases, key, base, 8)
+        return base
+
+    def _text_layer(self, text: str, size: int) -> tuple[np.ndarray, tuple[int, int]] | None:
+        """Krytí textu (0–1) v rozlišení karty a jeho posun vůči bodu, kam se text kreslí.
+
+        Glyfy se rastrují ve zvětšení upscale jen v rámci svého ohraničení
+        a zmenšují se LANCZOS filtrem, celá karta se tak převzorkovat nemusí.
+        """
+        key = (text, size)
+        if key in self._text_layers:
+            self._text_layers.move_to_end(key)
+            self.stats["text_hits"] += 1
+            return self._text_layers[key]
+        self.stats["text_misses"] += 1
+
+        up = self.upscale
+        font = self.font(size * up)
+        x0, y0, x1, y1 = font.getbbox(text)
+        if x1 <= x0 or y1 <= y0:
+            layer = None
+        else:
+            # okraj pro dozvuk filtru, zarovnaný na násobky upscale
+            pad = 2 * up
+            left = (x0 - pad) // up * up
+            top = (y0 - pad) // up * up
+            width = -(-(x1 + pad - left) // up) * up
+            height = -(-(y1 + pad - top) // up) * up
+            mask = Image.new("L", (width, height), 0)
+            ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+            mask = mask.resize((width // up, height // up), Image.LANCZOS)
+            alpha = np.asarray(mask, dtype=np.float32) / 255.0
+            alpha.flags.writeable = False
+            layer = (alpha, (left // up, top // up))
+        self._remember(self._text_layers, key, layer, self.max_layers)
+        return layer
+
+    def render(self,
+               photo: np.ndarray,
+               name: str,
+               surname: str,
+               department: str,
+               position: str,
+               personal_number: str,
+               template_file: str) -> np.ndarray:
+        texts = {
+            "full_name": f"{name} {surname}",
+            "department": f"{department}",
+            "position": f"{position}",
+            "personal_label": "Os.č.:",
+            "personal_number": f"{personal_number}",
+        }
+        with self._render_lock:
+            card = self._base_layer(photo, template_file).copy()
+            card_h, card_w = card.shape[:2]
+            for field, (x, y), size in TEXT_LAYOUT:
+                layer = self._text_layer(texts[field], size)
+                if layer is None:
+                    continue
+                alpha, (dx, dy) = layer
+                left, top = x + dx, y + dy
+                # ořez vrstvy na hranice karty
+                ax, ay = max(0, -left), max(0, -top)
+                x1, y1 = min(card_w, left + alpha.shape[1]), min(card_h, top + alpha.shape[0])
+                left, top = max(left, 0), max(top, 0)
+                if x1 <= left or y1 <= top:
+                    continue
+                a = alpha[ay:ay + y1 - top, ax:ax + x1 - left, None]
+                region = card[top:y1, left:x1]
+                # černý text: výsledek = podklad × (1 − krytí)
+                region[:] = (region * (1.0 - a) + 0.5).astype(np.uint8)
+        return card
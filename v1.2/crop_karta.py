@@ -4,10 +4,19 @@ import os
 import tkinter as tk
 from tkinter import scrolledtext
 from tkinter import ttk
-from threading import Thread
-from PIL import Image, ImageDraw, ImageFont, ImageTk
-import numpy as np
+from threading import Event, Thread
+import queue
+from PIL import Image, ImageTk
 import os, json
+import sqlite3
+
+from asset_mirror import AssetMirror, default_cache_dir
+from batch_engine import BatchEngine
+from card_render import CardRenderer
+from detect_cache import DetectionCache, detection_params
+from face_detect import DETECT_CHAIN, DETECTORS, FacePrior, configure_yunet
+from image_io import crop_face_from_file
+from output_writer import encode_image, output_path, write_if_changed
 
 def load_json(file_name):
     base_dir = os.path.dirname(os.path.abspath(__file__))  # složka se skriptem
@@ -29,6 +38,21 @@ output_idcards = CONFIG["output_idcards"]
 template_dir = CONFIG["template_dir"]
 font_path = CONFIG["font_path"]
 
+# === Detekce (0 = plné rozlišení) ===
+detect_max_side = CONFIG.get("detect_max_side", 0)
+detect_refine = CONFIG.get("detect_refine", True)
+decode_reduced = CONFIG.get("decode_reduced", True)
+detect_chain = CONFIG.get("detect_chain", list(DETECT_CHAIN))  # záložní stupně, když primární nic nenajde
+detect_budget_ms = CONFIG.get("detect_budget_ms", 1500)      # časový limit na fotku (0 = bez limitu)
+detector_backend = CONFIG.get("detector_backend", "haar")    # haar / lbp / yunet (modely v models/)
+configure_yunet(CONFIG.get("yunet_model", ""), CONFIG.get("yunet_score", 0.8))
+detect_prior = CONFIG.get("detect_prior", True)               # hledat nejdřív tam, kde byl obličej minule
+batch_workers = CONFIG.get("batch_workers", 0)  # 0 = všechna jádra
+
+# === Formát a kvalita výstupů (viz output_writer.DEFAULT_ENCODING) ===
+crop_encoding = CONFIG.get("crop_encoding", {})
+card_encoding = CONFIG.get("card_encoding", {"format": "png"})
+
 # === TEMPLATES s plnými cestami ===
 TEMPLATES = {category: os.path.join(template_dir, filename)
              for category, filename in TEMPLATES_JSON.items()}
@@ -39,53 +63,18 @@ def get_template_for_position(position):
             return TEMPLATES.get(category, list(TEMPLATES.values())[0])
     return list(TEMPLATES.values())[0]
 
-# === Ořez obličeje ===
-def crop_face_square(img):
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-    if len(faces) == 0:
-        return None
-    (x, y, w, h) = faces[0]
-    margin_x = int(w * 0.6)
-    top_margin_y = int(h * 0.8)
-    bottom_margin_y = int(h * 1.3)
-    x1 = max(x - margin_x, 0)
-    y1 = max(y - top_margin_y, 0)
-    x2 = min(x + w + margin_x, img.shape[1])
-    y2 = min(y + h + bottom_margin_y, img.shape[0])
-    cropped = img[y1:y2, x1:x2]
-    ch, cw = cropped.shape[:2]
-    side = min(ch, cw)
-    start_x = (cw - side) // 2
-    start_y = (ch - side) // 2
-    cropped_square = cropped[start_y:start_y + side, start_x:start_x + side]
-    return cv2.resize(cropped_square, (125, 125), interpolation=cv2.INTER_AREA)
-
-# === Vytvoření ID karty ===
-def create_id_card(photo, name, surname, department, position, personal_number, template_file):
-    template = cv2.imread(template_file)
-    if template is None:
-        raise FileNotFoundError(f"Šablona nenalezena: {template_file}")
-
-    template[55:55+125, 15:15+125] = photo
-
-    upscale = 2
-    template_big = cv2.resize(template, (template.shape[1]*upscale, template.shape[0]*upscale), interpolation=cv2.INTER_LINEAR)
-    template_pil = Image.fromarray(cv2.cvtColor(template_big, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(template_pil)
-
-    font_big = ImageFont.truetype(font_path, 22*upscale)
-    font_small = ImageFont.truetype(font_path, 16*upscale)
-
-    draw.text((15*upscale, 8*upscale), f"{name} {surname}", font=font_big, fill=(0, 0, 0))
-    draw.text((15*upscale, 33*upscale), f"{department}", font=font_small, fill=(0, 0, 0))
-    draw.text((180*upscale, 70*upscale), f"{position}", font=font_small, fill=(0, 0, 0))
-    draw.text((180*upscale, 90*upscale), "Os.č.:", font=font_small, fill=(0, 0, 0))
-    draw.text((235*upscale, 90*upscale), f"{personal_number}", font=font_small, fill=(0, 0, 0))
-
-    template_final = template_pil.resize((template.shape[1], template.shape[0]), Image.LANCZOS)
-    return cv2.cvtColor(np.array(template_final), cv2.COLOR_RGB2BGR)
+# === Místní kopie šablon a fontu (N: se kontroluje na pozadí) ===
+asset_cache_dir = CONFIG.get("asset_cache_dir") or default_cache_dir()
+asset_check_s = CONFIG.get("asset_check_s", 60)
+MIRROR = AssetMirror(asset_cache_dir)
+MIRROR.start(asset_check_s)
+
+# === Trvalá cache detekce ("" = vypnuto), místně – SQLite přes SMB sdílený více stanicemi hrozí poškozením ===
+detect_cache_path = CONFIG.get("detect_cache_path", os.path.join(asset_cache_dir, "detect_cache.sqlite"))
+detect_cache_hash = CONFIG.get("detect_cache_hash", False)
+
+# === Vykreslování ID karet ===
+RENDERER = CardRenderer(font_path, resolve=MIRROR.local)
 
 # === Okno pro zadání údajů s náhledem ===
 class DataEntryWindow(tk.Toplevel):
@@ -94,6 +83,7 @@ class DataEntryWindow(tk.Toplevel):
         self.cropped_img = cropped_img
         self.on_submit = on_submit
         self.title("Údaje pro ID kartu")
+        self.protocol("WM_DELETE_WINDOW", self.skip)
 
         main_x, main_y, main_w = master.winfo_x(), master.winfo_y(), master.winfo_width()
         self.geometry(f"700x300+{main_x + main_w + 20}+{main_y}")
@@ -166,7 +156,7 @@ class DataEntryWindow(tk.Toplevel):
         template_file = get_template_for_position(position)
 
         try:
-            card_img = create_id_card(self.cropped_img, name, surname, department, position, personal_number, template_file)
+            card_img = RENDERER.render(self.cropped_img, name, surname, department, position, personal_number, template_file)
             card_rgb = cv2.cvtColor(card_img, cv2.COLOR_BGR2RGB)
             pil_preview = Image.fromarray(card_rgb)
             pil_preview = pil_preview.resize((300, 190))
@@ -213,17 +203,67 @@ class CropApp:
         self.button = tk.Button(bottom_frame, text="Zavřít", command=root.destroy)
         self.button.pack(pady=5)
 
+        # Tk widgety smí měnit jen hlavní vlákno – worker posílá úkony do fronty
+        self.ui_queue = queue.Queue()
+        self.root.after(30, self.drain_ui)
+
         thread = Thread(target=self.run_processing, daemon=True)
         thread.start()
 
+    def drain_ui(self):
+        try:
+            while True:
+                fn, args = self.ui_queue.get_nowait()
+                try:
+                    fn(*args)
+                except Exception as e:
+                    # jeden chybný úkon nesmí zastavit frontu – worker by čekal navždy
+                    self._log(f"[CHYBA] Okno: {e}")
+        except queue.Empty:
+            pass
+        finally:
+            self.root.after(30, self.drain_ui)
+
+    def ui(self, fn, *args):
+        self.ui_queue.put((fn, args))
+
     def log(self, message):
+        self.ui(self._log, message)
+
+    def _log(self, message):
         self.text.config(state='normal')
         self.text.insert('end', message + '\n')
         self.text.yview('end')
         self.text.config(state='disabled')
 
     def set_status(self, text, color, font=("Segoe UI", 11)):
-        self.status_label.config(text=text, fg=color, font=font)
+        self.ui(self.status_label.config, {"text": text, "fg": color, "font": font})
+
+    def set_progress(self, value, maximum=None):
+        options = {"value": value}
+        if maximum is not None:
+            options["maximum"] = maximum
+        self.ui(self.progress.config, options)
+
+    def ask_data(self, cropped):
+        """Otevře formulář v hlavním vlákně a počká na odpověď obsluhy."""
+        done = Event()
+        result = {"data": None}
+
+        def on_submit(data):
+            result["data"] = data
+            done.set()
+
+        def open_form():
+            try:
+                DataEntryWindow(self.root, cropped, on_submit)
+            except Exception:
+                on_submit(None)  # formulář se neotevřel – fotka se přeskočí
+                raise
+
+        self.ui(open_form)
+        done.wait()
+        return result["data"]
 
     def run_processing(self):
         try:
@@ -238,45 +278,79 @@ class CropApp:
 
         files = [f for f in os.listdir(source_drive) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
         total = len(files)
-        self.progress["maximum"] = total
-
-        for i, filename in enumerate(files, 1):
-            self.set_status("Zpracovávám…", "blue")
+        self.set_progress(0, total)
+        detector_reported = False
+        prior = FacePrior() if detect_prior else None
+        cache = None
+        if detect_cache_path:
+            try:
+                cache = DetectionCache(detect_cache_path,
+                                       detection_params(detect_max_side, detect_refine, decode_reduced, detect_chain,
+                                                        detector_backend),
+                                       detect_cache_hash)
+            except (sqlite3.Error, OSError) as e:
+                self.log(f"[WARN] Cache detekce nedostupná: {e}")
+
+        def prepare(filename):
             full_src = os.path.join(source_drive, filename)
-            img = cv2.imread(full_src)
-            if img is None:
+            img, cropped, det = crop_face_from_file(full_src, detect_max_side, detect_refine, decode_reduced,
+                                                    cache, detect_chain, detect_budget_ms,
+                                                    backend=detector_backend, prior=prior)
+            # celý snímek dál nepotřebujeme, držíme jen ořez
+            return img is not None, cropped, det
+
+        engine = BatchEngine(prepare, batch_workers)
+        self.log(f"[INFO] Detekce běží na pozadí ({engine.workers} vláken)")
+        for i, (filename, future) in enumerate(engine.run(files), 1):
+            if not future.done():
+                self.set_status("Zpracovávám…", "blue")
+            try:
+                loaded, cropped, det = future.result()
+            except Exception as e:
+                self.log(f"[CHYBA] {filename}: {e}")
+                continue
+            if not loaded:
                 self.log(f"[WARN] Nelze načíst: {filename}")
                 continue
-            cropped = crop_face_square(img)
+            if not detector_reported:
+                for line in DETECTORS.report():
+                    self.log(line)
+                detector_reported = True
             if cropped is None:
-                self.log(f"[INFO] Obličej nenalezen: {filename}")
+                limit = ", vyčerpán časový limit" if det.exhausted else ""
+                self.log(f"[INFO] Obličej nenalezen: {filename} ({det.ms:.0f} ms{limit})")
                 continue
+            self.log(f"[INFO] {filename}: obličej nalezen (stupeň {det.stage}, {det.ms:.0f} ms)")
 
-            result_ready = {"data": None}
-            def on_submit(data): result_ready["data"] = data
-            self.root.after(0, lambda: DataEntryWindow(self.root, cropped, on_submit))
-            self.root.wait_window(self.root.winfo_children()[-1])
-            data = result_ready["data"]
+            self.set_status(f"Čeká na údaje ({i}/{total})", "blue")
+            data = self.ask_data(cropped)
 
             if data is None:
                 self.log(f"[SKIP] Přeskočeno: {filename}")
                 continue
 
-            crop_path = os.path.join(output_crop, filename)
-            cv2.imwrite(crop_path, cropped)
+            crop_path = output_path(os.path.join(output_crop, filename), crop_encoding)
             template_file = get_template_for_position(data["position"])
-            id_card = create_id_card(
+            id_card = RENDERER.render(
                 cropped, data["name"], data["surname"],
                 data["department"], data["position"], data["personal_number"],
                 template_file
             )
             card_filename = os.path.splitext(filename)[0] + "_ID.png"
-            card_path = os.path.join(output_idcards, card_filename)
-            cv2.imwrite(card_path, id_card)
+            card_path = output_path(os.path.join(output_idcards, card_filename), card_encoding)
+            try:
+                # stejný ořez nebo karta se znovu nezapisují
+                write_if_changed(crop_path, encode_image(crop_path, cropped, crop_encoding))
+                write_if_changed(card_path, encode_image(card_path, id_card, card_encoding))
+            except (OSError, ValueError) as e:
+                self.log(f"[CHYBA] Zápis selhal: {filename}: {e}")
+                continue
             self.log(f"[OK] Zpracováno: {filename}")
 
-            self.progress["value"] = i
+            self.set_progress(i)
 
+        if cache is not None:
+            cache.close()
         # finální stav
         self.set_status("Všechny fotky zpracovány", "green", font=("Segoe UI", 11, "bold"))
 
@@ -3,15 +3,42 @@
 """
 Jedno-oknová verze nástroje pro tvorbu ID karet.
 Náhled ID karty je nyní zobrazen v reálné velikosti šablony.
+S --batch MANIFEST běží bez okna nad seznamem zaměstnanců (CSV/JSON).
+OpenCV, NumPy a PIL se načítají až po zobrazení okna (viz load_modules).
 """
+from __future__ import annotations
+
+import time
+STARTED = time.perf_counter()  # od spuštění skriptu se měří start okna
+
 import os
+import sys
 import json
-import cv2
+import sqlite3
+import argparse
+import cProfile
+import pstats
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TYPE_CHECKING
 import tkinter as tk
 from tkinter import ttk
 from tkinter import scrolledtext
-from PIL import Image, ImageDraw, ImageFont, ImageTk
-import numpy as np
+
+from asset_mirror import AssetMirror, default_cache_dir
+from detect_cache import DetectionCache, detection_params
+from folder_index import FolderIndex, FolderWatcher
+from preview import PreviewScheduler
+from roster import Employee, Roster
+from session_journal import DONE, SessionJournal, journal_path
+from table_io import read_csv
+
+if TYPE_CHECKING:
+    import cv2
+    import numpy as np
+    from PIL import Image, ImageTk
+    from face_detect import Detection
 
 
 def load_json(file_name):
@@ -31,11 +58,46 @@ output_crop    = CONFIG["output_crop"]
 output_idcards = CONFIG["output_idcards"]
 template_dir   = CONFIG["template_dir"]
 font_path      = CONFIG["font_path"]
+detect_max_side = CONFIG.get("detect_max_side", 0)  # 0 = přesný rámeček; 800 je rychlejší, viz detect_face
+detect_refine   = CONFIG.get("detect_refine", True)
+decode_reduced  = CONFIG.get("decode_reduced", True)
+detect_chain    = CONFIG.get("detect_chain")  # None = výchozí řetězec z face_detect
+detect_budget_ms = CONFIG.get("detect_budget_ms", 1500)
+detector_backend = CONFIG.get("detector_backend", "haar")
+yunet_model     = CONFIG.get("yunet_model", "")   # "" = models/face_detection_yunet_2023mar.onnx
+yunet_score     = CONFIG.get("yunet_score", 0.8)
+detect_prior    = CONFIG.get("detect_prior", True)
+prefetch_depth  = CONFIG.get("prefetch_depth", 3)
+prefetch_workers = CONFIG.get("prefetch_workers", 2)
+prefetch_memory_mb = CONFIG.get("prefetch_memory_mb", 256)
+detect_cache_hash = CONFIG.get("detect_cache_hash", False)
+preview_debounce_ms = CONFIG.get("preview_debounce_ms", 60)
+watch_interval_s = CONFIG.get("watch_interval_s", 2.0)
+thumb_size = CONFIG.get("thumb_size", 64)
+metrics_path = CONFIG.get("metrics_path", os.path.join(output_crop, "metrics.jsonl"))
+metrics_summary_s = CONFIG.get("metrics_summary_s", 300)
+crop_encoding = CONFIG.get("crop_encoding", {})                   # formát a kvalita výstupů,
+card_encoding = CONFIG.get("card_encoding", {"format": "png"})    # viz output_writer.DEFAULT_ENCODING
+journal_dir = CONFIG.get("journal_dir", os.path.join(output_crop, "journal"))  # "" = bez deníku
+startup_target_ms = CONFIG.get("startup_target_ms", 3000)
+asset_cache_dir = CONFIG.get("asset_cache_dir") or default_cache_dir()
+asset_check_s = CONFIG.get("asset_check_s", 60)
+# cache náhledů a detekce jsou data jednoho počítače – SQLite přes SMB by zamykal
+# každý řádek seznamu a každou fotku, sdílený soubor by si navíc měnily tři stanice
+thumb_cache_path = CONFIG.get("thumb_cache_path", os.path.join(asset_cache_dir, "thumb_cache.sqlite"))
+detect_cache_path = CONFIG.get("detect_cache_path", os.path.join(asset_cache_dir, "detect_cache.sqlite"))
+roster_path = CONFIG.get("roster_path", "")  # export HR (CSV/XLSX); "" = bez vyhledávání
+roster_cache_path = CONFIG.get("roster_cache_path") or os.path.join(asset_cache_dir, "roster.json")
+lookup_min_chars = CONFIG.get("lookup_min_chars", 2)
 
 TEMPLATES = {category: os.path.join(template_dir, filename)
              for category, filename in TEMPLATES_JSON.items()}
 
 
+# šablony a font se čtou z místní kopie, N: se kontroluje na pozadí
+MIRROR = AssetMirror(asset_cache_dir)
+
+
 def get_template_for_position(position: str) -> str:
     for category, positions in POSITIONS.items():
         if position in positions:
@@ -44,60 +106,90 @@ def get_template_for_position(position: str) -> str:
     return next(iter(TEMPLATES.values()))
 
 
-def crop_face_square(img: np.ndarray) -> np.ndarray | None:
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-    if len(faces) == 0:
+_modules_loaded = False
+_modules_lock = threading.Lock()
+
+
+def load_modules():
+    """Načte OpenCV, NumPy, PIL a moduly, které je používají.
+
+    Samotný import trvá při studeném startu z N: déle než sestavení okna,
+    proto ho okno spouští až po svém zobrazení ve vlákně. Dávkový režim ho
+    volá na začátku každého procesu. Opakované volání nic nedělá.
+    """
+    global _modules_loaded, cv2, np, Image, ImageTk, RENDERER, FACE_PRIOR, detect_chain
+    global CardRenderer, TEXT_LAYOUT, DETECT_CHAIN, DETECTORS, Detection, crop_face_from_file, Metrics
+    global AsyncWriter, encode_image, output_path, write_if_changed, Prefetcher, compose_sheets, load_cards
+    global sheet_layout, write_sheets, ThumbnailStrip, ThumbnailCache, ThumbnailLoader
+    with _modules_lock:
+        if _modules_loaded:
+            return
+        import cv2
+        import numpy as np
+        from PIL import Image, ImageTk
+
+        from card_render import CardRenderer, TEXT_LAYOUT
+        from face_detect import DETECT_CHAIN, DETECTORS, Detection, FacePrior, configure_yunet
+        from image_io import crop_face_from_file
+        from metrics import Metrics
+        from output_writer import AsyncWriter, encode_image, output_path, write_if_changed
+        from prefetch import Prefetcher
+        from print_sheet import compose_sheets, load_cards, sheet_layout, write_sheets
+        from thumbnail_strip import ThumbnailStrip
+        from thumbnails import ThumbnailCache, ThumbnailLoader
+
+        if detect_chain is None:
+            detect_chain = list(DETECT_CHAIN)
+        configure_yunet(yunet_model, yunet_score)
+        RENDERER = CardRenderer(font_path, resolve=MIRROR.local)
+        # poloha obličeje se učí z fotek tohoto procesu (v dávce má každý proces svou)
+        FACE_PRIOR = FacePrior() if detect_prior else None
+        _modules_loaded = True
+
+
+def warm_up_assets() -> list[str]:
+    """Načte šablony a fonty (z místní kopie, poprvé z N:) do paměti rendereru
+    dřív, než je bude chtít první náhled."""
+    problems = []
+    for template_file in dict.fromkeys(TEMPLATES.values()):
+        try:
+            RENDERER.template(template_file)
+        except FileNotFoundError as e:
+            problems.append(f"[WARN] {e}")
+    try:
+        for size in {size for _, _, size in TEXT_LAYOUT}:
+            RENDERER.font(size)
+    except OSError as e:
+        problems.append(f"[WARN] Font nelze načíst: {font_path}: {e}")
+    return problems
+
+
+def open_detect_cache() -> DetectionCache | None:
+    if not detect_cache_path:
         return None
-    (x, y, w, h) = faces[0]
-    margin_x = int(w * 0.6)
-    top_margin_y = int(h * 0.8)
-    bottom_margin_y = int(h * 1.3)
-
-    x1 = max(x - margin_x, 0)
-    y1 = max(y - top_margin_y, 0)
-    x2 = min(x + w + margin_x, img.shape[1])
-    y2 = min(y + h + bottom_margin_y, img.shape[0])
-
-    cropped = img[y1:y2, x1:x2]
-    ch, cw = cropped.shape[:2]
-    side = min(ch, cw)
-    start_x = (cw - side) // 2
-    start_y = (ch - side) // 2
-    cropped_square = cropped[start_y:start_y + side, start_x:start_x + side]
-    return cv2.resize(cropped_square, (125, 125), interpolation=cv2.INTER_AREA)
-
-
-def create_id_card(photo: np.ndarray,
-                   name: str,
-                   surname: str,
-                   department: str,
-                   position: str,
-                   personal_number: str,
-                   template_file: str) -> np.ndarray:
-    template = cv2.imread(template_file)
-    if template is None:
-        raise FileNotFoundError(f"Šablona nenalezena: {template_file}")
-
-    template[55:55+125, 15:15+125] = photo
-
-    upscale = 2
-    template_big = cv2.resize(template, (template.shape[1]*upscale, template.shape[0]*upscale), interpolation=cv2.INTER_LINEAR)
-    template_pil = Image.fromarray(cv2.cvtColor(template_big, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(template_pil)
-
-    font_big = ImageFont.truetype(font_path, 22*upscale)
-    font_small = ImageFont.truetype(font_path, 16*upscale)
-
-    draw.text((15*upscale, 8*upscale), f"{name} {surname}", font=font_big, fill=(0, 0, 0))
-    draw.text((15*upscale, 33*upscale), f"{department}", font=font_small, fill=(0, 0, 0))
-    draw.text((180*upscale, 70*upscale), f"{position}", font=font_small, fill=(0, 0, 0))
-    draw.text((180*upscale, 90*upscale), "Os.č.:", font=font_small, fill=(0, 0, 0))
-    draw.text((235*upscale, 90*upscale), f"{personal_number}", font=font_small, fill=(0, 0, 0))
-
-    template_final = template_pil.resize((template.shape[1], template.shape[0]), Image.LANCZOS)
-    return cv2.cvtColor(np.array(template_final), cv2.COLOR_RGB2BGR)
+    params = detection_params(detect_max_side, detect_refine, decode_reduced, detect_chain, detector_backend)
+    return DetectionCache(detect_cache_path, params, detect_cache_hash)
+
+
+def prepare_photo(full_path: str,
+                  cache: DetectionCache | None = None,
+                  times: dict[str, float] | None = None) -> tuple[np.ndarray | None, np.ndarray | None, Detection]:
+    return crop_face_from_file(full_path, detect_max_side, detect_refine, decode_reduced, cache,
+                               detect_chain, detect_budget_ms, times, detector_backend, FACE_PRIOR)
+
+
+def describe_detection(det: Detection) -> str:
+    """Krátký popis průběhu detekce do logu."""
+    if det.face is None:
+        limit = ", vyčerpán časový limit" if det.exhausted else ""
+        return f"{det.ms:.0f} ms{limit}"
+    rotation = f", otočeno o {det.rotation}°" if det.rotation else ""
+    return f"stupeň {det.stage}, {det.ms:.0f} ms{rotation}"
+
+
+def describe_employee(e: Employee) -> str:
+    """Řádek nabídky vyhledávání."""
+    return " – ".join(part for part in (f"{e.surname} {e.name}".strip(), e.personal_number, e.department) if part)
 
 
 class SingleWindowApp:
@@ -111,12 +203,132 @@ class SingleWindowApp:
         self.current_img_bgr: np.ndarray | None = None
         self.current_crop_bgr: np.ndarray | None = None
         self.tk_preview_card = None
+        self._detector_reported = False
+        self._load_t0 = 0.0
+        self._ready = False
+        self._startup_error: Exception | None = None
+        self._startup_log: list[str] = []
+        self.journal = SessionJournal(None)
+        self.roster: Roster | None = None
+        self._lookup_matches: list[Employee] = []
+        self._filled_number: str | None = None  # osobní číslo posledního vyplnění ze seznamu
+        self._output_source: dict[str, str] = {}  # výstupní soubor -> zdrojová fotka (pro chyby zápisu)
+        # uložené fotky, jejichž výstupy ještě nejsou zapsané: jméno -> čekající soubory, výstupy, formulář
+        self._writing: dict[str, dict] = {}
+        self.pending_only = tk.BooleanVar(root, value=False)
+        self.startup: dict[str, float] = {}
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # okno jen z tkinteru – ukáže se dřív, než se načtou knihovny a šablony
         self._build_layout()
+        self.set_status("Načítám…", "blue")
+        self.preview = PreviewScheduler(root, self._render_preview, self._show_preview,
+                                        self._preview_failed, preview_debounce_ms)
+        self.folder_index = FolderIndex(source_drive)
+        self.root.after_idle(self._window_shown)
+        self._startup_thread = threading.Thread(target=self._start_background, name="startup", daemon=True)
+        self._startup_thread.start()
+        self.root.after(20, self._poll_startup)
 
-        os.makedirs(output_crop, exist_ok=True)
-        os.makedirs(output_idcards, exist_ok=True)
-        self.load_files()
+    def _window_shown(self):
+        self.startup["window"] = (time.perf_counter() - STARTED) * 1000
+
+    def _start_background(self):
+        # běží ve vlákně – na Tk widgety nesahat
+        try:
+            t0 = time.perf_counter()
+            load_modules()
+            t1 = time.perf_counter()
+            self.startup["imports"] = (t1 - t0) * 1000
+            self.metrics = Metrics(metrics_path or None)
+
+            os.makedirs(output_crop, exist_ok=True)
+            os.makedirs(output_idcards, exist_ok=True)
+            try:
+                self.thumb_cache = ThumbnailCache(thumb_cache_path, thumb_size) if thumb_cache_path else None
+            except (sqlite3.Error, OSError) as e:
+                self.thumb_cache = None
+                self._startup_log.append(f"[WARN] Cache náhledů nedostupná: {e}")
+            self.thumbs = ThumbnailLoader(self.thumb_cache, thumb_size)
+            try:
+                self.detect_cache = open_detect_cache()
+            except (sqlite3.Error, OSError) as e:
+                self.detect_cache = None
+                self._startup_log.append(f"[WARN] Cache detekce nedostupná: {e}")
+            # cache přežívá i "Načíst znovu" – klíčem je cesta + mtime
+            self.prefetcher = Prefetcher(self._prepare, prefetch_workers, prefetch_memory_mb * 1024 * 1024)
+
+            # první nezpracovaná fotka se dekóduje a detekuje, zatímco se načítají šablony a fonty
+            self.folder_index.refresh()
+            if journal_dir:
+                self.journal = SessionJournal(journal_path(journal_dir, source_drive))
+                if self.journal.load_error is not None:
+                    self._startup_log.append(f"[WARN] Deník zpracování nelze načíst: {self.journal.load_error}")
+            if roster_path:
+                t3 = time.perf_counter()
+                try:
+                    self.roster = Roster.load(roster_path, roster_cache_path)
+                    self.startup["roster"] = (time.perf_counter() - t3) * 1000
+                    source = "místní kopie" if self.roster.from_cache else roster_path
+                    self._startup_log.append(f"[INFO] Zaměstnanci: {len(self.roster)} ({source}, "
+                                             f"{self.startup['roster']:.0f} ms)")
+                    if self.roster.stale:
+                        self._startup_log.append(f"[WARN] Export zaměstnanců nedostupný, platí poslední kopie: {roster_path}")
+                except (OSError, ValueError) as e:
+                    self._startup_log.append(f"[WARN] Seznam zaměstnanců nelze načíst: {e}")
+            pending = [name for name in self.folder_index.names() if self._pending(name)]
+            if pending:
+                self.prefetcher.request(os.path.join(source_drive, pending[0]))
+            t2 = time.perf_counter()
+            self._startup_log.extend(warm_up_assets())
+            self.startup["assets"] = (time.perf_counter() - t2) * 1000
+            MIRROR.start(asset_check_s)
+        except Exception as e:
+            self._startup_error = e
+
+    def _poll_startup(self):
+        if self._startup_thread.is_alive():
+            self.root.after(20, self._poll_startup)
+            return
+        for line in self._startup_log:
+            self.log(line)
+        if self._startup_error is not None:
+            self.log(f"[CHYBA] Start se nezdařil: {self._startup_error}")
+            self.set_status("Chyba při startu", "red")
+            return
+        self._finish_startup()
+
+    def _finish_startup(self):
+        self.strip = ThumbnailStrip(self.list_frame, source_drive, self.thumbs, self.on_select_file, thumb_size,
+                                    status=self._status)
+        self.strip.pack(fill=tk.BOTH, expand=True)
+        self.writer = AsyncWriter()
+        self.root.after(300, self._poll_writer)
+        self.root.after(1000, self._poll_assets)
+        self.root.after(metrics_summary_s * 1000, self._log_metrics)
+        self._ready = True
+        self.startup["ready"] = (time.perf_counter() - STARTED) * 1000
+
+        self.load_files(rescan=False)  # složku už prošlo vlákno startu
+        self.watcher = FolderWatcher(source_drive, watch_interval_s)
+        self.root.after(500, self._poll_folder)
+        if not self.files:
+            self._report_startup()
+
+    def _report_startup(self):
+        """Jednou za běh: jak dlouho trvalo, než obsluha viděla první náhled."""
+        if "reported" in self.startup:
+            return
+        self.startup["reported"] = 1
+        if self.current_crop_bgr is not None:
+            self.startup["first_preview"] = (time.perf_counter() - STARTED) * 1000
+        total = self.startup.get("first_preview", self.startup.get("ready", 0.0))
+        parts = [f"{label} {self.startup[key]:.0f} ms" for key, label in (
+            ("window", "okno"), ("imports", "knihovny"), ("roster", "zaměstnanci"), ("assets", "šablony a fonty"),
+            ("ready", "seznam"), ("first_preview", "první náhled")) if key in self.startup]
+        tag = "[WARN]" if total > startup_target_ms else "[INFO]"
+        self.log(f"{tag} Start: " + ", ".join(parts) + f" (cíl {startup_target_ms} ms)")
+        self.metrics.record("startup", "", {k: v for k, v in self.startup.items() if k != "reported"})
 
     def _build_layout(self):
         self.pw = ttk.Panedwindow(self.root, orient=tk.HORIZONTAL)
@@ -126,9 +338,11 @@ class SingleWindowApp:
         self.pw.add(left_frame, weight=1)
 
         tk.Label(left_frame, text="Soubory ve zdroji", font=("Segoe UI", 10, "bold")).pack(anchor="w")
-        self.listbox = tk.Listbox(left_frame, height=25)
-        self.listbox.pack(fill=tk.BOTH, expand=True, pady=(4, 8))
-        self.listbox.bind("<<ListboxSelect>>", self.on_select_file)
+        ttk.Checkbutton(left_frame, text="Jen nezpracované", variable=self.pending_only,
+                        command=lambda: self.load_files(rescan=False)).pack(anchor="w")
+        # seznam s náhledy se vloží po načtení knihoven
+        self.list_frame = ttk.Frame(left_frame)
+        self.list_frame.pack(fill=tk.BOTH, expand=True, pady=(4, 8))
 
         btns_left = ttk.Frame(left_frame)
         btns_left.pack(fill=tk.X)
@@ -148,6 +362,8 @@ class SingleWindowApp:
 
         tk.Label(right_frame, text="Údaje", font=("Segoe UI", 10, "bold")).grid(row=0, column=0, columnspan=2, sticky="w")
 
+        # příjmení nebo osobní číslo; po výběru se vyplní celý formulář ze seznamu zaměstnanců
+        self.combo_lookup = ttk.Combobox(right_frame)
         self.entry_name = ttk.Entry(right_frame)
         self.entry_surname = ttk.Entry(right_frame)
         self.entry_personal = ttk.Entry(right_frame)
@@ -165,6 +381,7 @@ class SingleWindowApp:
         self.update_positions()
 
         labels = [
+            ("Vyhledat", self.combo_lookup),
             ("Jméno", self.entry_name),
             ("Příjmení", self.entry_surname),
             ("Oddělení", self.combo_department),
@@ -180,7 +397,10 @@ class SingleWindowApp:
 
         self.entry_name.bind("<KeyRelease>", self.update_card_preview)
         self.entry_surname.bind("<KeyRelease>", self.update_card_preview)
-        self.entry_personal.bind("<KeyRelease>", self.update_card_preview)
+        self.entry_personal.bind("<KeyRelease>", self.on_personal_key)
+        self.combo_lookup.bind("<KeyRelease>", self.on_lookup_key)
+        self.combo_lookup.bind("<Return>", self.on_lookup_pick)
+        self.combo_lookup.bind("<<ComboboxSelected>>", self.on_lookup_pick)
         self.combo_department.bind("<<ComboboxSelected>>", self.update_card_preview)
         self.combo_position.bind("<<ComboboxSelected>>", self.update_card_preview)
         self.combo_position_category.bind("<<ComboboxSelected>>", self.on_category_change)
@@ -195,8 +415,12 @@ class SingleWindowApp:
 
         self.progress = ttk.Progressbar(bottom, orient="horizontal", mode="determinate")
         self.progress.pack(fill=tk.X)
-        self.status_label = ttk.Label(bottom, text="Připraveno", foreground="green")
-        self.status_label.pack(anchor="w", pady=(3, 0))
+        status_row = ttk.Frame(bottom)
+        status_row.pack(fill=tk.X, pady=(3, 0))
+        self.status_label = ttk.Label(status_row, text="Připraveno", foreground="green")
+        self.status_label.pack(side=tk.LEFT)
+        self.write_label = ttk.Label(status_row, text="")
+        self.write_label.pack(side=tk.RIGHT)
 
         self.log_box = scrolledtext.ScrolledText(self.root, height=8, state="disabled", font=("Consolas", 10))
         self.log_box.pack(fill=tk.BOTH, expand=False, padx=8, pady=(0, 8))
@@ -210,49 +434,156 @@ class SingleWindowApp:
     def set_status(self, text: str, color: str = "black"):
         self.status_label.configure(text=text, foreground=color)
 
-    def load_files(self):
-        try:
-            files = [f for f in os.listdir(source_drive) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
-        except FileNotFoundError:
-            files = []
-        self.files = sorted(files)
-        self.listbox.delete(0, tk.END)
-        for f in self.files:
-            self.listbox.insert(tk.END, f)
-        self.progress["maximum"] = len(self.files)
-        self.progress["value"] = 0
+    def load_files(self, rescan: bool = True):
+        if not self._ready:
+            return
+        current = self.files[self.index] if 0 <= self.index < len(self.files) else None
+        if rescan:
+            self.folder_index.refresh()
+        self.files = self.folder_index.names()
+        if self.pending_only.get():
+            self.files = [name for name in self.files if self._pending(name)]
+        self.strip.set_items(self.files)
         self.index = -1
         if self.files:
-            self.index = 0
-            self.listbox.selection_clear(0, tk.END)
-            self.listbox.selection_set(0)
-            self.listbox.activate(0)
+            # po opětovném načtení zůstane vybraná stejná fotka, jinak první nezpracovaná
+            self.index = self.files.index(current) if current in self.files else self._next_pending(0)
+            self._select_index()
             self.load_current_image()
-        self.set_status("Načteno %d souborů" % len(self.files), "blue")
+        total, done = self._update_progress()
+        self.set_status(f"Načteno {total} souborů, zpracováno {done}, zbývá {total - done}", "blue")
 
-    def on_select_file(self, event=None):
-        sel = self.listbox.curselection()
-        if not sel:
-            return
-        self.index = int(sel[0])
+    # --- stav fotek podle deníku ---
+    def _status(self, name: str) -> str | None:
+        if name in self._writing:
+            return "saved"  # do deníku se zapíše, až doběhne zápis obou výstupů
+        return self.journal.status(name, self.folder_index.entries.get(name))
+
+    def _pending(self, name: str) -> bool:
+        return self._status(name) not in DONE
+
+    def _next_pending(self, start: int) -> int:
+        """Index první nezpracované fotky od start dál (dokola); když žádná není, start."""
+        n = len(self.files)
+        for k in range(n):
+            i = (start + k) % n
+            if self._pending(self.files[i]):
+                return i
+        return min(start, n - 1)
+
+    def _update_progress(self) -> tuple[int, int]:
+        names = self.folder_index.names()
+        done = sum(1 for name in names if not self._pending(name))
+        self.progress["maximum"] = max(1, len(names))
+        self.progress["value"] = done
+        return len(names), done
+
+    def _finish_current(self, status: str, outputs: list[str] | tuple = (), form: dict | None = None):
+        """Zapíše výsledek aktuální fotky do deníku a přejde na další nezpracovanou.
+
+        Uložení se do deníku zapíše až po zápisu výstupů (viz _write_done), aby
+        fotka, jejíž výstupy nevznikly, nebyla po pádu vedená jako hotová.
+        """
+        filename = self.files[self.index]
+        if status == "saved":
+            self._writing[filename] = {"pending": set(outputs), "outputs": list(outputs), "form": dict(form or {})}
+        else:
+            self.journal.record(filename, status, self.folder_index.entries.get(filename), outputs, form)
+        self._update_progress()
+        self.strip.redraw()
+        self.combo_lookup.set("")
+        self._lookup_matches = []
+        if not self.pending_only.get():
+            self.index = self._next_pending(self.index + 1)
+        else:
+            # vyřízená fotka ze seznamu zmizí, na jejím místě je další nezpracovaná
+            del self.files[self.index]
+            self.strip.delete(self.index)
+            if not self.files:
+                self.index = -1
+                self.current_img_bgr = None
+                self.current_crop_bgr = None
+                self.update_card_preview()
+                self.set_status("Vše zpracováno", "green")
+                return
+            self.index = min(self.index, len(self.files) - 1)
+        self._select_index()
+        self.load_current_image()
+
+    def _select_index(self):
+        self.strip.select(self.index)
+
+    def _poll_folder(self):
+        if self.watcher.changed.is_set():
+            self.watcher.changed.clear()
+            changes = self.folder_index.refresh()
+            if changes:
+                self.apply_folder_changes(changes)
+        self.root.after(500, self._poll_folder)
+
+    def apply_folder_changes(self, changes):
+        """Zapracuje přidané, odebrané a změněné soubory do seznamu bez úplného načtení."""
+        current = self.files[self.index] if 0 <= self.index < len(self.files) else None
+        for name in changes.removed:
+            i = bisect_left(self.files, name)
+            if i < len(self.files) and self.files[i] == name:
+                del self.files[i]
+                self.strip.delete(i)
+        added = changes.added
+        if self.pending_only.get():
+            # změněná fotka už neodpovídá deníku, takže je znovu nezpracovaná
+            added = sorted([name for name in changes.added if self._pending(name)]
+                           + [name for name in changes.modified if name not in self.files])
+        for name in added:
+            i = bisect_left(self.files, name)
+            self.files.insert(i, name)
+            self.strip.insert(i, name)
+        for name in changes.modified:
+            self.strip.invalidate(name)
+        self._update_progress()
+
+        i = bisect_left(self.files, current) if current is not None else 0
+        if current is not None and i < len(self.files) and self.files[i] == current:
+            self.index = i
+            self._select_index()
+            if current in changes.modified:
+                self.load_current_image()
+        elif self.files:
+            # aktuální fotka zmizela (nebo seznam byl prázdný) – pokračujeme na jejím místě
+            self.index = min(i, len(self.files) - 1)
+            self._select_index()
+            self.load_current_image()
+        else:
+            self.index = -1
+            self.current_img_bgr = None
+            self.current_crop_bgr = None
+            self.update_card_preview()
+
+        # detekce jen pro nové a změněné soubory, až za aktuální fotkou a oknem dopředu;
+        # přechod na jinou fotku je neruší
+        fresh = changes.added + changes.modified
+        self.prefetcher.prefetch([os.path.join(source_drive, name) for name in fresh],
+                                 start=prefetch_depth + 1, background=True)
+        self.log(f"[INFO] Složka změněna: +{len(changes.added)} −{len(changes.removed)} "
+                 f"~{len(changes.modified)} (celkem {len(self.files)})")
+
+    def on_select_file(self, index: int):
+        self.index = index
+        self._select_index()
         self.load_current_image()
 
     def prev_file(self):
         if not self.files:
             return
         self.index = (self.index - 1) % len(self.files)
-        self.listbox.selection_clear(0, tk.END)
-        self.listbox.selection_set(self.index)
-        self.listbox.activate(self.index)
+        self._select_index()
         self.load_current_image()
 
     def next_file(self):
         if not self.files:
             return
         self.index = (self.index + 1) % len(self.files)
-        self.listbox.selection_clear(0, tk.END)
-        self.listbox.selection_set(self.index)
-        self.listbox.activate(self.index)
+        self._select_index()
         self.load_current_image()
 
     def load_current_image(self):
@@ -260,30 +591,66 @@ class SingleWindowApp:
             return
         filename = self.files[self.index]
         full_path = os.path.join(source_drive, filename)
-        img = cv2.imread(full_path)
+        ahead = [os.path.join(source_drive, self.files[(self.index + i) % len(self.files)])
+                 for i in range(1, min(prefetch_depth, len(self.files) - 1) + 1)]
+        # fotka, na kterou obsluha čeká, jde přede všechny předběžné úlohy; zastaralé se zruší
+        future = self.prefetcher.focus(full_path, ahead)
+        self._load_t0 = time.perf_counter()
+        if future.done():
+            self._show_loaded(filename, future)
+            return
+        self.current_img_bgr = None
+        self.current_crop_bgr = None
+        self.set_status("Načítám…", "blue")
+        self._poll_loaded(future, self.index, filename)
+
+    def _prepare(self, full_path: str):
+        # běží ve vlákně prefetch
+        times = {}
+        result = prepare_photo(full_path, self.detect_cache, times)
+        self.metrics.record("load", os.path.basename(full_path), times)
+        return result
+
+    def _poll_loaded(self, future, index: int, filename: str):
+        if index != self.index or index >= len(self.files) or self.files[index] != filename:
+            return  # obsluha mezitím přešla jinam
+        if not future.done():
+            self.root.after(15, self._poll_loaded, future, index, filename)
+            return
+        self._show_loaded(filename, future)
+
+    def _show_loaded(self, filename: str, future):
+        # jak dlouho obsluha na fotku čekala (0, pokud ji prefetch připravil předem)
+        self.metrics.record("show", filename, {"wait": (time.perf_counter() - self._load_t0) * 1000})
+        try:
+            img, crop, det = future.result()
+        except Exception as e:
+            self.log(f"[CHYBA] {filename}: {e}")
+            img, crop, det = None, None, None
         if img is None:
             self.log(f"[WARN] Nelze načíst: {filename}")
             self.set_status("Chyba načtení", "red")
             self.current_img_bgr = None
             self.current_crop_bgr = None
             self.update_card_preview()
+            self._report_startup()
             return
         self.current_img_bgr = img
-
-        crop = crop_face_square(img)
         self.current_crop_bgr = crop
+        if not self._detector_reported:
+            for line in DETECTORS.report():
+                self.log(line)
+            self._detector_reported = True
         if crop is None:
-            self.log(f"[INFO] Obličej nenalezen: {filename}")
+            self.log(f"[INFO] Obličej nenalezen: {filename} ({describe_detection(det)})")
             self.set_status("Obličej nenalezen", "orange")
+            self._report_startup()
         else:
-            self.set_status("Zpracováno – ořez připraven", "green")
+            if det.stage not in ("primary", "prior", "cache"):
+                self.log(f"[INFO] {filename}: obličej nalezen záložní detekcí ({describe_detection(det)})")
+            self.set_status(f"Zpracováno – ořez připraven ({det.stage}, {det.ms:.0f} ms)", "green")
         self.update_card_preview()
 
-    def _to_tk(self, bgr: np.ndarray) -> ImageTk.PhotoImage:
-        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb)
-        return ImageTk.PhotoImage(img)
-
     def on_category_change(self, event=None):
         self.update_positions()
         self.update_card_preview()
@@ -297,6 +664,54 @@ class SingleWindowApp:
         else:
             self.combo_position.set("")
 
+    def on_lookup_key(self, event=None):
+        if event is not None and event.keysym in ("Return", "KP_Enter", "Up", "Down", "Escape", "Tab"):
+            return
+        text = self.combo_lookup.get().strip()
+        if self.roster is None or len(text) < lookup_min_chars:
+            self._lookup_matches = []
+        else:
+            self._lookup_matches = self.roster.search(text)
+        self.combo_lookup["values"] = [describe_employee(e) for e in self._lookup_matches]
+        if len(self._lookup_matches) == 1:
+            self.fill_from_roster(self._lookup_matches[0])
+
+    def on_lookup_pick(self, event=None):
+        # Enter bez výběru ze seznamu vezme první shodu
+        i = self.combo_lookup.current()
+        if not self._lookup_matches:
+            return
+        employee = self._lookup_matches[i if 0 <= i < len(self._lookup_matches) else 0]
+        self.combo_lookup.set(describe_employee(employee))
+        self.fill_from_roster(employee)
+
+    def on_personal_key(self, event=None):
+        employee = self.roster.lookup(self.entry_personal.get()) if self.roster is not None else None
+        if employee is not None and employee.personal_number != self._filled_number:
+            self.fill_from_roster(employee)
+        else:
+            self.update_card_preview()
+
+    def fill_from_roster(self, employee: Employee):
+        self._filled_number = employee.personal_number
+        for entry, value in ((self.entry_name, employee.name), (self.entry_surname, employee.surname),
+                             (self.entry_personal, employee.personal_number)):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        # výběry jsou jen z číselníků; hodnotu, kterou neznají, musí obsluha vybrat ručně
+        if employee.department in DEPARTMENTS:
+            self.combo_department.set(employee.department)
+        elif employee.department:
+            self.log(f"[WARN] Oddělení „{employee.department}“ není v departments.json – vyberte ručně")
+        category = next((c for c, positions in POSITIONS.items() if employee.position in positions), None)
+        if category is not None:
+            self.combo_position_category.set(category)
+            self.update_positions()
+            self.combo_position.set(employee.position)
+        elif employee.position:
+            self.log(f"[WARN] Pozice „{employee.position}“ není v positions.json – vyberte ručně")
+        self.update_card_preview()
+
     def gather_form(self) -> dict:
         return {
             "name": self.entry_name.get().strip(),
@@ -309,20 +724,38 @@ class SingleWindowApp:
     def update_card_preview(self, event=None):
         data = self.gather_form()
         if self.current_crop_bgr is None:
+            self.preview.cancel()
             self.lbl_card.config(image="", text="Bez náhledu")
             self.tk_preview_card = None
             return
-        try:
-            template_file = get_template_for_position(data["position"])
-            card_bgr = create_id_card(self.current_crop_bgr,
-                                      data["name"], data["surname"],
-                                      data["department"], data["position"], data["personal_number"],
-                                      template_file)
-            tkimg = self._to_tk(card_bgr)
-            self.tk_preview_card = tkimg
-            self.lbl_card.config(image=tkimg)
-        except Exception as e:
-            self.log(f"[Preview error] {e}")
+        self.preview.request((self.current_crop_bgr, data))
+
+    def _render_preview(self, job) -> tuple[Image.Image, dict[str, float]]:
+        # běží ve vlákně náhledu – na Tk widgety nesahat
+        crop, data = job
+        t0 = time.perf_counter()
+        template_file = get_template_for_position(data["position"])
+        card_bgr = RENDERER.render(crop,
+                                   data["name"], data["surname"],
+                                   data["department"], data["position"], data["personal_number"],
+                                   template_file)
+        t1 = time.perf_counter()
+        img = Image.fromarray(cv2.cvtColor(card_bgr, cv2.COLOR_BGR2RGB))
+        return img, {"render": (t1 - t0) * 1000, "convert": (time.perf_counter() - t1) * 1000}
+
+    def _show_preview(self, result: tuple[Image.Image, dict[str, float]]):
+        img, times = result
+        t0 = time.perf_counter()
+        tkimg = ImageTk.PhotoImage(img)
+        self.tk_preview_card = tkimg
+        self.lbl_card.config(image=tkimg)
+        times["tk"] = (time.perf_counter() - t0) * 1000
+        name = self.files[self.index] if 0 <= self.index < len(self.files) else ""
+        self.metrics.record("preview", name, times)
+        self._report_startup()
+
+    def _preview_failed(self, e: Exception):
+        self.log(f"[Preview error] {e}")
 
     def save_current(self):
         if self.index < 0 or self.index >= len(self.files):
@@ -333,33 +766,298 @@ class SingleWindowApp:
         data = self.gather_form()
         filename = self.files[self.index]
 
-        crop_path = os.path.join(output_crop, filename)
-        cv2.imwrite(crop_path, self.current_crop_bgr)
+        crop_path = output_path(os.path.join(output_crop, filename), crop_encoding)
+        self.writer.submit(crop_path, self.current_crop_bgr, crop_encoding)
 
+        t0 = time.perf_counter()
         template_file = get_template_for_position(data["position"])
-        card_bgr = create_id_card(self.current_crop_bgr,
-                                  data["name"], data["surname"],
-                                  data["department"], data["position"], data["personal_number"],
-                                  template_file)
+        card_bgr = RENDERER.render(self.current_crop_bgr,
+                                   data["name"], data["surname"],
+                                   data["department"], data["position"], data["personal_number"],
+                                   template_file)
         card_filename = os.path.splitext(filename)[0] + "_ID.png"
-        card_path = os.path.join(output_idcards, card_filename)
-        cv2.imwrite(card_path, card_bgr)
+        card_path = output_path(os.path.join(output_idcards, card_filename), card_encoding)
+        self.writer.submit(card_path, card_bgr, card_encoding)
+        self.metrics.record("save", filename, {"render": (time.perf_counter() - t0) * 1000})
+        self._output_source[crop_path] = self._output_source[card_path] = filename
 
         self.log(f"[OK] Uloženo: {filename}")
-        self.progress["value"] = min(len(self.files), self.index)
         self.set_status("Uloženo", "green")
-        self.next_file()
+        self._finish_current("saved", [crop_path, card_path], data)
+
+    def _poll_writer(self):
+        for status, path, message, times in self.writer.events():
+            if status == "failed":
+                self.log(f"[CHYBA] Zápis selhal: {path}: {message}")
+                self._write_failed(path)
+                self._update_progress()
+                self.strip.redraw()
+                continue
+            if status == "skipped":
+                self.log(f"[INFO] Beze změny, nepřepsáno: {os.path.basename(path)}")
+            self._write_done(path)
+            self.metrics.record("write", os.path.basename(path), times)
+        parts = []
+        if self.writer.pending:
+            parts.append(f"čeká {self.writer.pending}")
+        if self.writer.failed:
+            parts.append(f"chyb {self.writer.failed}")
+        self.write_label.configure(text=("Zápis: " + ", ".join(parts)) if parts else "",
+                                   foreground="red" if self.writer.failed else "blue")
+        self.root.after(300, self._poll_writer)
+
+    def _poll_assets(self):
+        for status, path in MIRROR.events():
+            if status == "updated":
+                self.log(f"[INFO] Na N: je novější {os.path.basename(path)} – stažen do místní kopie")
+            elif status == "offline":
+                self.log("[WARN] N: je nedostupný – šablony a font se berou z místní kopie")
+            else:
+                self.log("[INFO] N: je opět dostupný")
+        self.root.after(1000, self._poll_assets)
+
+    def _write_done(self, path: str):
+        """Po zápisu posledního výstupu fotky se uložení zapíše do deníku."""
+        name = self._output_source.get(path)
+        writing = self._writing.get(name)
+        if writing is None:
+            return
+        writing["pending"].discard(path)
+        if not writing["pending"]:
+            del self._writing[name]
+            self.journal.record(name, "saved", self.folder_index.entries.get(name),
+                                writing["outputs"], writing["form"])
+
+    def _write_failed(self, path: str):
+        """Fotka, jejíž výstup se nezapsal, je v deníku znovu k zpracování."""
+        name = self._output_source.get(path)
+        if name is not None:
+            self._writing.pop(name, None)
+            self.journal.record(name, "failed", self.folder_index.entries.get(name), [path])
+
+    def _log_metrics(self):
+        if self.metrics.pending:
+            for line in self.metrics.summary() + self._counters():
+                self.log(line)
+        self.root.after(metrics_summary_s * 1000, self._log_metrics)
+
+    def _counters(self) -> list[str]:
+        """Počítadla cache a front od startu – patří do logu vedle časů."""
+        lines = [f"[INFO] Náhled: {self.preview.requested} požadavků, "
+                 f"{self.preview.rendered} vykresleno, {self.preview.skipped} přeskočeno",
+                 f"[INFO] Zápis: {self.writer.written} souborů zapsáno, {self.writer.skipped} beze změny"]
+        if self.prefetcher.cancelled:
+            lines.append(f"[INFO] Předběžné načítání: {self.prefetcher.cancelled} zastaralých úloh zrušeno")
+        if self.thumb_cache is not None:
+            lines.append(f"[INFO] Náhledy: {self.thumb_cache.hits} z cache, {self.thumb_cache.misses} nově")
+        if self.detect_cache is not None:
+            lines.append(f"[INFO] Detekce: {self.detect_cache.hits} z cache, {self.detect_cache.misses} nově")
+        if FACE_PRIOR is not None and FACE_PRIOR.hits + FACE_PRIOR.misses:
+            lines.append(f"[INFO] Obličej v oblasti z předchozích fotek: {FACE_PRIOR.hits}×, "
+                         f"celý snímek {FACE_PRIOR.misses}×")
+        return lines
+
+    def on_close(self):
+        if not self._ready:
+            # start ještě neskončil – není co dokončovat ani ukládat
+            self.preview.close()
+            self.root.destroy()
+            return
+        self.watcher.stop()
+        MIRROR.close()
+        if self.writer.pending:
+            self.set_status(f"Dokončuji zápis ({self.writer.pending})…", "blue")
+            self.root.update_idletasks()
+        if not self.writer.close(timeout=120):
+            print(f"[CHYBA] Nezapsáno {self.writer.pending} souborů – síťový disk nedostupný")
+        for status, path, message, times in self.writer.events():
+            if status == "failed":
+                print(f"[CHYBA] Zápis selhal: {path}: {message}")
+                self._write_failed(path)
+            else:
+                self._write_done(path)
+                self.metrics.record("write", os.path.basename(path), times)
+        for writing in list(self._writing.values()):
+            # zápis nestihl doběhnout – po novém vložení karty se fotka zpracuje znovu
+            self._write_failed(next(iter(writing["pending"])))
+        self.journal.close()
+        if self.journal.lost:
+            print(f"[CHYBA] Do deníku {self.journal.path} se nezapsalo {self.journal.lost} záznamů")
+        self.preview.close()
+        self.prefetcher.shutdown()
+        self.thumbs.close()
+        if self.thumb_cache is not None:
+            self.thumb_cache.close()
+        if self.detect_cache is not None:
+            self.detect_cache.close()
+        self.metrics.close()
+        self.root.destroy()
 
     def skip_current(self):
         if self.index < 0 or self.index >= len(self.files):
             return
-        filename = self.files[self.index]
-        self.log(f"[SKIP] Přeskočeno: {filename}")
-        self.progress["value"] = min(len(self.files), self.index)
-        self.next_file()
+        self.log(f"[SKIP] Přeskočeno: {self.files[self.index]}")
+        self._finish_current("skipped")
+
+
+MANIFEST_FIELDS = ("filename", "name", "surname", "department", "position", "personal_number")
+
+_batch_cache: DetectionCache | None = None
+
+
+def load_manifest(path: str) -> list[dict]:
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        table = read_csv(path)
+        rows = [dict(zip(table[0], row)) for row in table[1:]] if table else []
+    return [{key: str(row.get(key) or "").strip() for key in MANIFEST_FIELDS} for row in rows]
+
+
+def render_row(source: str, row: dict) -> dict:
+    """Ořez a karta pro jeden řádek manifestu; běží v procesu z poolu."""
+    global _batch_cache
+    load_modules()  # procesy z poolu (spawn na Windows) začínají bez knihoven
+    if _batch_cache is None and detect_cache_path:
+        try:
+            _batch_cache = open_detect_cache()
+        except (sqlite3.Error, OSError):
+            pass
+
+    filename = row["filename"]
+    result = {"filename": filename, "status": "failed", "message": "", "times": {}}
+    if not filename:
+        result["message"] = "chybí název souboru"
+        return result
+    t0 = time.perf_counter()
+    try:
+        img, crop, det = prepare_photo(os.path.join(source, filename), _batch_cache)
+        t1 = time.perf_counter()
+        result["times"]["crop"] = t1 - t0
+        if img is None:
+            result["message"] = "nelze načíst"
+            return result
+        result["detection"] = describe_detection(det)
+        if crop is None:
+            result["status"] = "noface"
+            result["message"] = "obličej nenalezen"
+            return result
+
+        card_bgr = RENDERER.render(crop,
+                                   row["name"], row["surname"],
+                                   row["department"], row["position"], row["personal_number"],
+                                   get_template_for_position(row["position"]))
+        t2 = time.perf_counter()
+        result["times"]["render"] = t2 - t1
+
+        crop_path = output_path(os.path.join(output_crop, filename), crop_encoding)
+        card_path = output_path(os.path.join(output_idcards, os.path.splitext(filename)[0] + "_ID.png"),
+                                card_encoding)
+        written = [write_if_changed(crop_path, encode_image(crop_path, crop, crop_encoding)),
+                   write_if_changed(card_path, encode_image(card_path, card_bgr, card_encoding))]
+        result["times"]["write"] = time.perf_counter() - t2
+        result["outputs"] = [crop_path, card_path]
+        if not any(written):
+            result["message"] = "beze změny, nepřepsáno"
+        result["card_path"] = card_path
+        result["status"] = "ok"
+    except Exception as e:
+        result["message"] = str(e)
+    return result
+
+
+def run_batch(manifest: str, source: str, workers: int | None,
+              sheets_dir: str | None = None, sheet_dpi: int = 300) -> int:
+    load_modules()
+    MIRROR.refresh()  # procesy dávky pak čtou z aktuální místní kopie
+    try:
+        rows = load_manifest(manifest)
+    except (OSError, ValueError) as e:
+        print(f"[CHYBA] Manifest nelze načíst: {e}")
+        return 2
+    os.makedirs(output_crop, exist_ok=True)
+    os.makedirs(output_idcards, exist_ok=True)
+    print(f"[INFO] Dávka: {len(rows)} řádků z {manifest}, zdroj {source}")
+    # okno pak u stejné karty pokračuje tím, co dávka nezpracovala
+    journal = SessionJournal(journal_path(journal_dir, source) if journal_dir else None)
+
+    t0 = time.perf_counter()
+    counts = {"ok": 0, "noface": 0, "failed": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_row, source, row): row for row in rows}
+        for future in as_completed(futures):
+            r = future.result()
+            counts[r["status"]] += 1
+            try:
+                # prázdné jméno by vrátilo stat samotné složky
+                st = os.stat(os.path.join(source, r["filename"])) if r["filename"] else None
+            except OSError:
+                st = None  # fotka na kartě není – do deníku nepatří
+            if st is not None and r["status"] != "noface":
+                form = {k: v for k, v in futures[future].items() if k in MANIFEST_FIELDS and k != "filename"}
+                journal.record(r["filename"], "saved" if r["status"] == "ok" else "failed",
+                               (st.st_mtime_ns, st.st_size), r.get("outputs", []), form)
+            times = ", ".join(f"{stage} {sec * 1000:.0f} ms" for stage, sec in r["times"].items())
+            tag = {"ok": "[OK]", "noface": "[INFO]", "failed": "[CHYBA]"}[r["status"]]
+            detection = f"; detekce: {r['detection']}" if "detection" in r else ""
+            print(f"{tag} {r['filename']}: {r['message'] or 'uloženo'} ({times}{detection})")
+
+    elapsed = time.perf_counter() - t0
+    print(f"[INFO] Hotovo za {elapsed:.1f} s: {counts['ok']} uloženo, "
+          f"{counts['noface']} bez obličeje, {counts['failed']} chyb")
+    journal.close()
+
+    if sheets_dir:
+        # archy v pořadí manifestu
+        card_paths = [f.result()["card_path"] for f in futures if f.result()["status"] == "ok"]
+        layout = sheet_layout(sheet_dpi)
+        written = write_sheets(compose_sheets(load_cards(card_paths), layout), sheets_dir, sheet_dpi)
+        print(f"[OK] Archy pro tisk: {len(written)} souborů v {sheets_dir}")
+    return 0 if counts["ok"] == len(rows) else 1
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tvorba ID karet ze snímků z fotoaparátu.")
+    parser.add_argument("drive", nargs="?",
+                        help="písmeno karty předávané z watchdog.ps1 (zdroj se bere z config.json)")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="CSV/JSON se sloupci " + ", ".join(MANIFEST_FIELDS) + "; běží bez okna")
+    parser.add_argument("--source", default=source_drive,
+                        help="složka se snímky pro dávkový režim (výchozí source_drive)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="počet procesů pro dávkový režim (výchozí počet jader)")
+    parser.add_argument("--sheets", metavar="DIR",
+                        help="po dávce sestavit karty na archy A4 (PNG + PDF) do složky DIR")
+    parser.add_argument("--sheet-dpi", type=int, default=300, help="rozlišení archů pro tisk")
+    parser.add_argument("--profile", nargs="?", const="crop_karta.pstats", metavar="PATH",
+                        help="profilovat běh přes cProfile a při ukončení uložit statistiky do PATH")
+    return parser.parse_args(argv)
+
+
+def dump_profile(profiler: cProfile.Profile, path: str):
+    profiler.disable()
+    profiler.dump_stats(path)
+    # cProfile vidí jen hlavní (Tk) vlákno – práce na pozadí je v metrikách
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    print(f"[INFO] Profil uložen: {path} (python -m pstats {path})")
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = SingleWindowApp(root)
-    root.mainloop()
+    args = parse_args()
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    exit_code = 0
+    try:
+        if args.batch:
+            exit_code = run_batch(args.batch, args.source, args.workers, args.sheets, args.sheet_dpi)
+        else:
+            root = tk.Tk()
+            app = SingleWindowApp(root)
+            root.mainloop()
+    finally:
+        if profiler is not None:
+            dump_profile(profiler, args.profile)
+    sys.exit(exit_code)
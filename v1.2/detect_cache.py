@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Trvalá cache výsledků detekce (SQLite v místním profilu uživatele).
+Klíčem je cesta, velikost a mtime souboru (volitelně i hash obsahu) spolu
+s nastavením detekce; změněný soubor se tak automaticky detekuje znovu.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import NamedTuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    path     TEXT    NOT NULL,
+    params   TEXT    NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     TEXT,
+    face     TEXT,
+    region   TEXT,
+    rotation INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (path, params)
+);
+CREATE INDEX IF NOT EXISTS detections_hash ON detections (hash, params);
+"""
+
+
+class CachedDetection(NamedTuple):
+    face: tuple[int, int, int, int] | None      # obličej v plném rozlišení, None = nenalezen
+    region: tuple[int, int, int] | None         # (x, y, strana) čtvercového ořezu v plném rozlišení
+    rotation: int = 0                           # otočení snímku před ořezem (face a region platí po něm)
+
+
+def detection_params(max_side: int, refine: bool, reduced: bool,
+                     chain: tuple[str, ...] | list[str] = ("primary",), backend: str = "haar") -> str:
+    """Otisk nastavení detekce – jiné nastavení znamená jiné záznamy v cache."""
+    params = f"{max_side}:{int(refine)}:{int(reduced)}"
+    if list(chain) != ["primary"]:
+        params += ":" + "+".join(chain)  # delší řetězec zkusí znovu i dřív nenalezené obličeje
+    if backend != "haar":
+        params += "@" + backend  # jiný detektor najde jiný rámeček
+    return params
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _pack(values) -> str | None:
+    return None if values is None else ",".join(str(int(v)) for v in values)
+
+
+def _unpack(text: str | None) -> tuple | None:
+    return None if text is None else tuple(int(v) for v in text.split(","))
+
+
+class DetectionCache:
+    def __init__(self, db_path: str, params: str, use_hash: bool = False):
+        self.db_path = db_path
+        self.params = params
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(detections)")]
+        if "rotation" not in columns:
+            # cache z dřívější verze
+            self._db.execute("ALTER TABLE detections ADD COLUMN rotation INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+
+    def _identity(self, path: str) -> tuple[int, int, str | None] | None:
+        try:
+            st = os.stat(path)
+            digest = file_hash(path) if self.use_hash else None
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, digest
+
+    def lookup(self, path: str) -> CachedDetection | None:
+        ident = self._identity(path)
+        if ident is None:
+            return None
+        size, mtime_ns, digest = ident
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, hash, face, region, rotation FROM detections WHERE path = ? AND params = ?",
+                    (path, self.params)).fetchone()
+                if digest is not None and (row is None or row[2] != digest):
+                    # stejný obsah pod jinou cestou (např. jiné písmeno karty)
+                    row = self._db.execute(
+                        "SELECT size, mtime_ns, hash, face, region, rotation FROM detections WHERE hash = ? AND params = ?",
+                        (digest, self.params)).fetchone()
+        except sqlite3.Error:
+            return None
+
+        if row is None or row[0] != size or (digest is None and row[1] != mtime_ns) \
+                or (digest is not None and row[2] != digest):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedDetection(_unpack(row[3]), _unpack(row[4]), row[5])
+
+    def store(self, path: str, face, region, rotation: int = 0):
+        ident = self._identity(path)
+        if ident is None:
+            return
+        size, mtime_ns, digest = ident
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO detections (path, params, size, mtime_ns, hash, face, region, rotation) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, self.params, size, mtime_ns, digest, _pack(face), _pack(region), rotation))
+                self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,521 @@
+# -*- coding: utf-8 -*-
+"""
+Sdílená detekce obličeje pro crop_karta.py i crop_karta_single_window.py.
+Kaskády se z disku čtou jednou za proces, každé vlákno má vlastní instanci.
+Primární detektor je volitelný (viz BACKENDS): Haar, LBP nebo YuNet (DNN);
+modely, které nejsou součástí balíčku OpenCV, leží ve složce models/ vedle
+skriptů (model YuNet lze nastavit i jinde, viz configure_yunet).
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+import cv2
+import numpy as np
+
+HAAR_FRONTAL = "haarcascade_frontalface_default.xml"
+HAAR_FRONTAL_ALT2 = "haarcascade_frontalface_alt2.xml"
+HAAR_PROFILE = "haarcascade_profileface.xml"
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+LBP_FRONTAL = os.path.join(MODEL_DIR, "lbpcascade_frontalface.xml")
+YUNET_MODEL = os.path.join(MODEL_DIR, "face_detection_yunet_2023mar.onnx")
+
+
+# === Registr detektorů ===
+class DetectorRegistry:
+    def __init__(self, base_dir: str = cv2.data.haarcascades):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._xml: dict[str, str] = {}
+        self._stats: dict[str, dict] = {}
+
+    def _resolve(self, name: str) -> str:
+        return name if os.path.isabs(name) else os.path.join(self.base_dir, name)
+
+    def _read_xml(self, name: str) -> str:
+        # XML se čte z disku jen jednou za proces, vlákna si z něj staví vlastní instanci
+        with self._lock:
+            if name in self._xml:
+                return self._xml[name]
+            path = self._resolve(name)
+            if not os.path.isfile(path):
+                raise RuntimeError(f"Kaskáda nenalezena: {path}")
+            t0 = time.perf_counter()
+            with open(path, "r", encoding="utf-8") as f:
+                xml = f.read()
+            self._xml[name] = xml
+            self._stats[name] = {"path": path, "read_ms": (time.perf_counter() - t0) * 1000,
+                                 "instances": 0, "build_ms": 0.0}
+            return xml
+
+    def _built(self, name: str, build_ms: float):
+        with self._lock:
+            self._stats[name]["instances"] += 1
+            self._stats[name]["build_ms"] += build_ms
+
+    def get(self, name: str = HAAR_FRONTAL) -> cv2.CascadeClassifier:
+        cascades = getattr(self._local, "cascades", None)
+        if cascades is None:
+            cascades = self._local.cascades = {}
+        cascade = cascades.get(name)
+        if cascade is not None:
+            return cascade
+
+        xml = self._read_xml(name)
+        t0 = time.perf_counter()
+        fs = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        cascade = cv2.CascadeClassifier()
+        ok = cascade.read(fs.getFirstTopLevelNode())
+        fs.release()
+        if not ok or cascade.empty():
+            raise RuntimeError(f"Nelze načíst kaskádu: {self._resolve(name)}")
+        self._built(name, (time.perf_counter() - t0) * 1000)
+        cascades[name] = cascade
+        return cascade
+
+    def yunet(self, path: str, score_threshold: float) -> cv2.FaceDetectorYN:
+        nets = getattr(self._local, "nets", None)
+        if nets is None:
+            nets = self._local.nets = {}
+        net = nets.get(path)
+        if net is not None:
+            return net
+
+        if not hasattr(cv2, "FaceDetectorYN"):
+            raise RuntimeError(f"YuNet vyžaduje OpenCV 4.5.4 nebo novější (nainstalováno {cv2.__version__})")
+        if not os.path.isfile(path):
+            raise RuntimeError(f"Model YuNet nenalezen: {path} – stáhněte face_detection_yunet_2023mar.onnx "
+                               f"z opencv_zoo (models/face_detection_yunet) nebo nastavte yunet_model v config.json")
+        with self._lock:
+            self._stats.setdefault(path, {"path": path, "read_ms": 0.0, "instances": 0, "build_ms": 0.0})
+        t0 = time.perf_counter()
+        # velikost vstupu se nastavuje před každým snímkem
+        net = cv2.FaceDetectorYN.create(path, "", (320, 320), score_threshold)
+        self._built(path, (time.perf_counter() - t0) * 1000)
+        nets[path] = net
+        return net
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {name: dict(s) for name, s in self._stats.items()}
+
+    def report(self) -> list[str]:
+        lines = []
+        for name, s in self.stats().items():
+            lines.append(f"[INFO] Detektor {name}: čtení {s['read_ms']:.1f} ms, "
+                         f"{s['instances']}× sestaven za {s['build_ms']:.1f} ms")
+        return lines
+
+
+DETECTORS = DetectorRegistry()
+
+
+# === Primární detektory ===
+def _gray(img: np.ndarray) -> np.ndarray:
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+class CascadeBackend:
+    """Haar nebo LBP kaskáda – obě čte CascadeClassifier, LBP je rychlejší a méně přesná."""
+
+    def __init__(self, cascade: str, scale_factor: float = 1.1, min_neighbors: int = 5):
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, img: np.ndarray, min_size: tuple[int, int] | None = None,
+               max_size: tuple[int, int] | None = None) -> np.ndarray:
+        """Obličeje (x, y, w, h) ve snímku BGR nebo šedotónovém."""
+        kwargs = {}
+        if min_size:
+            kwargs["minSize"] = min_size
+        if max_size:
+            kwargs["maxSize"] = max_size
+        return DETECTORS.get(self.cascade).detectMultiScale(
+            _gray(img), scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, **kwargs)
+
+
+class YuNetBackend:
+    """cv2.FaceDetectorYN – malá konvoluční síť, spolehlivější na natočené a tmavé obličeje."""
+
+    def __init__(self, model: str, score_threshold: float = 0.8):
+        self.model = model
+        self.score_threshold = score_threshold
+
+    def detect(self, img: np.ndarray, min_size: tuple[int, int] | None = None,
+               max_size: tuple[int, int] | None = None) -> np.ndarray:
+        net = DETECTORS.yunet(self.model, self.score_threshold)
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        h, w = img.shape[:2]
+        net.setInputSize((w, h))
+        _, faces = net.detect(img)
+        if faces is None or len(faces) == 0:
+            return np.empty((0, 4), np.int32)
+        faces = faces[np.argsort(-faces[:, -1])]  # nejjistější první
+        # rámeček sítě je užší a sahá po bradu – čtverec o šířce obličeje odpovídá
+        # rámečku Haarovy kaskády, na který jsou nastavené okraje ořezu
+        x, y, fw, fh = (faces[:, i] for i in range(4))
+        cx, cy = x + fw / 2, y + fh / 2
+        boxes = np.stack([cx - fw / 2, cy - fw / 2, fw, fw], axis=1)
+        if min_size:
+            boxes = boxes[boxes[:, 2] >= min_size[0]]
+        if max_size:
+            boxes = boxes[boxes[:, 2] <= max_size[0]]
+        boxes[:, 0] = np.clip(boxes[:, 0], 0, np.maximum(w - boxes[:, 2], 0))
+        boxes[:, 1] = np.clip(boxes[:, 1], 0, np.maximum(h - boxes[:, 3], 0))
+        return np.round(boxes).astype(np.int32)
+
+
+BACKENDS = {
+    "haar": CascadeBackend(HAAR_FRONTAL),
+    "lbp": CascadeBackend(LBP_FRONTAL),
+    "yunet": YuNetBackend(YUNET_MODEL),
+}
+
+
+def configure_yunet(model: str = "", score_threshold: float | None = None):
+    """Model a práh YuNet z config.json; prázdná cesta = models/ vedle skriptů."""
+    backend = BACKENDS["yunet"]
+    backend.model = model or YUNET_MODEL
+    if score_threshold is not None:
+        backend.score_threshold = score_threshold
+
+
+def get_backend(name: str = "haar"):
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Neznámý detektor: {name} (možnosti: {', '.join(BACKENDS)})")
+    return backend
+
+
+# === Poloha obličeje z předchozích fotek ===
+class FaceRoi(NamedTuple):
+    box: tuple[int, int, int, int]   # (x1, y1, x2, y2) oblasti, kde se hledá
+    min_side: int                    # meze velikosti obličeje v pixelech snímku
+    max_side: int
+
+
+class FacePrior:
+    """Kde a jak velký byl obličej na dosavadních fotkách sezení.
+
+    Fotoaparát stojí na stativu před stejnou stěnou, obličej je proto na
+    každém snímku skoro na stejném místě. Z posledních nálezů se odvodí
+    oblast s rezervou a rozsah velikostí; detekce ji zkusí první a celý
+    snímek prochází jen tehdy, když v ní nic nenajde. Na výšku a na šířku
+    se vede zvlášť.
+    """
+
+    def __init__(self, history: int = 20, min_hits: int = 3, pad: float = 0.75):
+        self.history = history
+        self.min_hits = min_hits
+        self.pad = pad            # rezerva kolem obličeje v násobcích jeho strany
+        self.hits = 0             # nalezeno v oblasti
+        self.misses = 0           # v oblasti nic, prošel se celý snímek
+        self._lock = threading.Lock()
+        # na šířku? -> (střed x, střed y, strana) jako podíl šířky, výšky a delší strany
+        self._faces: dict[bool, deque] = {}
+
+    def observe(self, face: tuple[int, int, int, int], width: int, height: int):
+        x, y, w, h = face
+        sample = ((x + w / 2) / width, (y + h / 2) / height, max(w, h) / max(width, height))
+        with self._lock:
+            faces = self._faces.setdefault(width >= height, deque(maxlen=self.history))
+            faces.append(sample)
+
+    def roi(self, width: int, height: int) -> FaceRoi | None:
+        """Oblast k prohledání, dokud není dost nálezů None."""
+        with self._lock:
+            faces = self._faces.get(width >= height)
+            if faces is None or len(faces) < self.min_hits:
+                return None
+            arr = np.asarray(faces)
+        long_side = max(width, height)
+        cx, cy = np.median(arr[:, 0]) * width, np.median(arr[:, 1]) * height
+        min_side, max_side = arr[:, 2].min() * long_side, arr[:, 2].max() * long_side
+        # rezerva na pohyb hlavy a na rozptyl dosavadních poloh
+        half_w = max_side * (0.5 + self.pad) + np.ptp(arr[:, 0]) * width / 2
+        half_h = max_side * (0.5 + self.pad) + np.ptp(arr[:, 1]) * height / 2
+        box = (max(0, int(cx - half_w)), max(0, int(cy - half_h)),
+               min(width, int(cx + half_w) + 1), min(height, int(cy + half_h) + 1))
+        return FaceRoi(box, int(min_side * 0.8), int(max_side * 1.25) + 1)
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+# === Detekce obličeje ===
+def _dominant(faces) -> tuple[int, int, int, int] | None:
+    """Největší nalezený obličej – vedle fotografovaného bývá v záběru jen drobný šum nebo plakát."""
+    if len(faces) == 0:
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda f: int(f[2]) * int(f[3])))
+
+
+def _detect(gray: np.ndarray, name: str = HAAR_FRONTAL, scale_factor: float = 1.1,
+            min_neighbors: int = 5, **kwargs) -> np.ndarray:
+    face_cascade = DETECTORS.get(name)
+    return face_cascade.detectMultiScale(gray, scaleFactor=scale_factor, minNeighbors=min_neighbors, **kwargs)
+
+
+def detect_face(img: np.ndarray, max_side: int = 0, refine: bool = True,
+                backend: str = "haar", roi: FaceRoi | None = None) -> tuple[int, int, int, int] | None:
+    """Vrátí (x, y, w, h) největšího obličeje v souřadnicích plného snímku.
+
+    Je-li max_side > 0 a snímek je větší, hledá se na zmenšené kopii
+    s delší stranou max_side. S refine se rámeček zpřesní na plném
+    rozlišení ve výřezu kolem nalezeného obličeje. S roi se hledá jen
+    v dané oblasti a jen obličej v daném rozsahu velikostí.
+
+    Přesně stejný rámeček jako detekce na celém snímku dává jen max_side = 0
+    bez roi. Zmenšená kopie i výřez posouvají mřížku posuvného okna kaskády,
+    takže rámeček se liší zhruba o 2–3 % velikosti obličeje (na fotce 6000 px
+    např. strana 1128–1140 místo 1155) a ořez o jednotky až desítky úrovní
+    jasu. Na zmenšené kopii se u fotky s více obličeji může jako největší
+    vybrat jiný obličej.
+    """
+    detector = get_backend(backend)
+    h_img, w_img = img.shape[:2]
+    scale = 1.0
+    if max_side and max(h_img, w_img) > max_side:
+        scale = max_side / max(h_img, w_img)
+
+    region, ox, oy = img, 0, 0
+    min_size = max_size = None
+    if roi is not None:
+        ox, oy, x2, y2 = roi.box
+        region = img[oy:y2, ox:x2]
+        # měřítko zůstává podle celého snímku – oblast je jen menší, ne podrobnější
+        min_size = (max(1, int(roi.min_side * scale)),) * 2
+        max_size = (int(roi.max_side * scale) + 1,) * 2
+
+    if scale == 1.0:
+        face = _dominant(detector.detect(region, min_size, max_size))
+        if face is None:
+            return None
+        x, y, w, h = face
+        return x + ox, y + oy, w, h
+
+    small = cv2.resize(region, (max(1, round(region.shape[1] * scale)), max(1, round(region.shape[0] * scale))),
+                       interpolation=cv2.INTER_AREA)
+    face = _dominant(detector.detect(small, min_size, max_size))
+    if face is None:
+        return None
+    x, y, w, h = (int(round(v / scale)) for v in face)
+    x, y = x + ox, y + oy
+    if not refine:
+        return x, y, w, h
+
+    # zpřesnění na plném rozlišení jen v okolí obličeje a jen v blízkých měřítkách
+    pad = max(w, h) // 2
+    rx1, ry1 = max(x - pad, 0), max(y - pad, 0)
+    rx2, ry2 = min(x + w + pad, w_img), min(y + h + pad, h_img)
+    side = max(w, h)
+    refined = detector.detect(img[ry1:ry2, rx1:rx2], (int(side * 0.8), int(side * 0.8)),
+                              (int(side * 1.25), int(side * 1.25)))
+    if len(refined) == 0:
+        return x, y, w, h
+    fx, fy, fw, fh = _dominant(refined)
+    return rx1 + fx, ry1 + fy, fw, fh
+
+
+# === Záložní řetězec detekce ===
+DETECT_CHAIN = ("primary", "rotate", "relaxed", "alt2", "tilt", "profile")
+
+ROTATE_CODES = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+
+
+class Detection(NamedTuple):
+    face: tuple[int, int, int, int] | None   # v souřadnicích snímku otočeného o rotation
+    rotation: int = 0                        # 0/90/180/270 ° po směru hodinových ručiček
+    stage: str = ""                          # stupeň, který obličej našel ("" = nenalezen)
+    ms: float = 0.0
+    exhausted: bool = False                  # řetězec přerušil časový limit
+
+
+def rotate_image(img: np.ndarray, rotation: int) -> np.ndarray:
+    return cv2.rotate(img, ROTATE_CODES[rotation]) if rotation else img
+
+
+def _proxy_gray(img: np.ndarray, max_side: int) -> tuple[np.ndarray, float]:
+    h_img, w_img = img.shape[:2]
+    scale = 1.0
+    if max_side and max(h_img, w_img) > max_side:
+        scale = max_side / max(h_img, w_img)
+        img = cv2.resize(img, (round(w_img * scale), round(h_img * scale)), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), scale
+
+
+def _min_size(gray: np.ndarray) -> tuple[int, int]:
+    # na fotce na průkaz zabírá obličej velkou část snímku – drobné nálezy v pozadí jsou šum
+    side = min(gray.shape[:2]) // 10
+    return side, side
+
+
+def _equalize(gray: np.ndarray) -> np.ndarray:
+    # lokální vyrovnání kontrastu – tmavé a podexponované snímky bez falešných nálezů v pozadí
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+
+def _stage_relaxed(gray: np.ndarray, out_of_time) -> tuple[tuple | None, int]:
+    # jemnější krok měřítka a méně potvrzujících sousedů
+    return _dominant(_detect(_equalize(gray), scale_factor=1.05, min_neighbors=4, minSize=_min_size(gray))), 0
+
+
+def _stage_alt2(gray: np.ndarray, out_of_time) -> tuple[tuple | None, int]:
+    return _dominant(_detect(_equalize(gray), HAAR_FRONTAL_ALT2, 1.05, 4, minSize=_min_size(gray))), 0
+
+
+def _stage_rotate(gray: np.ndarray, out_of_time) -> tuple[tuple | None, int]:
+    # fotka otočená o 90° bez (nebo se špatnou) EXIF orientací
+    for rotation in (90, 270, 180):
+        if out_of_time():
+            break
+        face = _dominant(_detect(rotate_image(gray, rotation)))
+        if face is not None:
+            return face, rotation
+    return None, 0
+
+
+def _stage_tilt(gray: np.ndarray, out_of_time) -> tuple[tuple | None, int]:
+    # nakloněná hlava: hledáme v pootočeném snímku a střed vrátíme zpět
+    h, w = gray.shape[:2]
+    for angle in (15, -15):
+        if out_of_time():
+            break
+        m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        face = _dominant(_detect(cv2.warpAffine(gray, m, (w, h), borderMode=cv2.BORDER_REPLICATE),
+                              scale_factor=1.05, min_neighbors=4, minSize=_min_size(gray)))
+        if face is None:
+            continue
+        fx, fy, fw, fh = face
+        cx, cy = cv2.invertAffineTransform(m) @ np.array([fx + fw / 2, fy + fh / 2, 1.0])
+        x = int(min(max(cx - fw / 2, 0), w - fw))
+        y = int(min(max(cy - fh / 2, 0), h - fh))
+        return (x, y, fw, fh), 0
+    return None, 0
+
+
+def _stage_profile(gray: np.ndarray, out_of_time) -> tuple[tuple | None, int]:
+    # kaskáda profilu hledá jen jednu stranu – druhou najde v zrcadlovém snímku
+    face = _dominant(_detect(gray, HAAR_PROFILE, 1.05, 4, minSize=_min_size(gray)))
+    if face is None and not out_of_time():
+        face = _dominant(_detect(cv2.flip(gray, 1), HAAR_PROFILE, 1.05, 4, minSize=_min_size(gray)))
+        if face is not None:
+            x, y, w, h = face
+            face = (gray.shape[1] - x - w, y, w, h)
+    return face, 0
+
+
+FALLBACK_STAGES = {
+    "relaxed": _stage_relaxed,
+    "alt2": _stage_alt2,
+    "rotate": _stage_rotate,
+    "tilt": _stage_tilt,
+    "profile": _stage_profile,
+}
+
+
+def detect_face_chain(img: np.ndarray,
+                      max_side: int = 0,
+                      refine: bool = True,
+                      chain: tuple[str, ...] | list[str] = DETECT_CHAIN,
+                      budget_ms: float = 0,
+                      backend: str = "haar",
+                      prior: FacePrior | None = None) -> Detection:
+    """Zkouší stupně řetězce v daném pořadí, dokud některý obličej nenajde.
+
+    "primary" je detect_face() se zvoleným detektorem; s prior se nejdřív
+    prohledá jen oblast, kde byl obličej na předchozích fotkách (stupeň
+    "prior"). Záložní stupně používají Haarovy kaskády a běží na zmenšené
+    kopii snímku. Další stupeň se nezačne, pokud snímek už spotřeboval
+    budget_ms (0 = bez limitu) – jedna špatná fotka tak nezdrží frontu.
+    """
+    t0 = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return (time.perf_counter() - t0) * 1000
+
+    def out_of_time() -> bool:
+        return bool(budget_ms) and elapsed_ms() >= budget_ms
+
+    gray, scale = None, 1.0
+    for i, stage in enumerate(chain):
+        if i > 0 and out_of_time():
+            return Detection(None, 0, "", elapsed_ms(), True)
+        if stage == "primary":
+            h_img, w_img = img.shape[:2]
+            roi = prior.roi(w_img, h_img) if prior is not None else None
+            if roi is not None:
+                face = detect_face(img, max_side, refine, backend, roi)
+                prior.record(face is not None)
+                if face is not None:
+                    prior.observe(face, w_img, h_img)
+                    return Detection(face, 0, "prior", elapsed_ms())
+                if out_of_time():
+                    return Detection(None, 0, "", elapsed_ms(), True)
+            face = detect_face(img, max_side, refine, backend)
+            if face is not None:
+                # záložní stupně se neučí – jejich nálezy bývají méně jisté
+                if prior is not None:
+                    prior.observe(face, w_img, h_img)
+                return Detection(face, 0, stage, elapsed_ms())
+            continue
+        if stage not in FALLBACK_STAGES:
+            raise ValueError(f"Neznámý stupeň detekce: {stage}")
+        if gray is None:
+            gray, scale = _proxy_gray(img, max_side)
+        face, rotation = FALLBACK_STAGES[stage](gray, out_of_time)
+        if face is not None:
+            face = tuple(int(round(v / scale)) for v in face)
+            return Detection(face, rotation, stage, elapsed_ms())
+    return Detection(None, 0, "", elapsed_ms(), out_of_time())
+
+
+# === Ořez obličeje ===
+def square_crop_region(face: tuple[int, int, int, int], width: int, height: int) -> tuple[int, int, int]:
+    """Vrátí (x, y, strana) čtvercového výřezu kolem obličeje."""
+    (x, y, w, h) = face
+    margin_x = int(w * 0.6)
+    top_margin_y = int(h * 0.8)
+    bottom_margin_y = int(h * 1.3)
+
+    x1 = max(x - margin_x, 0)
+    y1 = max(y - top_margin_y, 0)
+    x2 = min(x + w + margin_x, width)
+    y2 = min(y + h + bottom_margin_y, height)
+
+    cw, ch = x2 - x1, y2 - y1
+    side = min(ch, cw)
+    start_x = (cw - side) // 2
+    start_y = (ch - side) // 2
+    return x1 + start_x, y1 + start_y, side
+
+
+def crop_region(img: np.ndarray, region: tuple[int, int, int]) -> np.ndarray:
+    sx, sy, side = region
+    cropped_square = img[sy:sy + side, sx:sx + side]
+    return cv2.resize(cropped_square, (125, 125), interpolation=cv2.INTER_AREA)
+
+
+def crop_square(img: np.ndarray, face: tuple[int, int, int, int]) -> np.ndarray:
+    return crop_region(img, square_crop_region(face, img.shape[1], img.shape[0]))
+
+
+def crop_face_square(img: np.ndarray, max_side: int = 0, refine: bool = True,
+                     chain: tuple[str, ...] | list[str] = DETECT_CHAIN, budget_ms: float = 0,
+                     backend: str = "haar", prior: FacePrior | None = None) -> np.ndarray | None:
+    det = detect_face_chain(img, max_side, refine, chain, budget_ms, backend, prior)
+    if det.face is None:
+        return None
+    return crop_square(rotate_image(img, det.rotation), det.face)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Průběžný index zdrojové složky.
+FolderIndex porovná nový os.scandir s předchozím stavem a vrátí jen rozdíly,
+FolderWatcher hlásí změny ve složce (inotify na Linuxu, jinde dotazování).
+"""
+import os
+import select
+import sys
+import threading
+from typing import NamedTuple
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+class FolderChanges(NamedTuple):
+    added: list[str]
+    removed: list[str]
+    modified: list[str]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
+class FolderIndex:
+    def __init__(self, folder: str, extensions: tuple[str, ...] = IMAGE_EXTENSIONS):
+        self.folder = folder
+        self.extensions = extensions
+        self.entries: dict[str, tuple[int, int]] = {}  # název -> (mtime_ns, velikost)
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        entries = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if not entry.name.lower().endswith(self.extensions):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries[entry.name] = (st.st_mtime_ns, st.st_size)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            pass
+        return entries
+
+    def refresh(self) -> FolderChanges:
+        current = self._scan()
+        old = self.entries
+        added = sorted(name for name in current if name not in old)
+        removed = sorted(name for name in old if name not in current)
+        modified = sorted(name for name in current if name in old and current[name] != old[name])
+        self.entries = current
+        return FolderChanges(added, removed, modified)
+
+    def names(self) -> list[str]:
+        return sorted(self.entries)
+
+
+# === Hlídání změn ===
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_UNMOUNT = 0x00002000
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_UNMOUNT)
+
+
+class FolderWatcher:
+    """Nastaví `changed`, když se ve složce mohlo něco změnit.
+    Samotné rozdíly zjistí FolderIndex.refresh() v hlavním vlákně."""
+
+    def __init__(self, folder: str, poll_interval_s: float = 2.0):
+        self.folder = folder
+        self.poll_interval_s = poll_interval_s
+        self.changed = threading.Event()
+        self.mode = "poll"
+        self._stop = threading.Event()
+        self._fd = self._open_inotify() if sys.platform.startswith("linux") else None
+        if self._fd is not None:
+            self.mode = "inotify"
+        self._thread = threading.Thread(target=self._run, name="folder-watch", daemon=True)
+        self._thread.start()
+
+    def _open_inotify(self) -> int | None:
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(self.folder), WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _run(self):
+        if self._fd is not None:
+            self._run_inotify()
+        # bez inotify (Windows, síťové disky): index se porovná v pravidelném intervalu
+        self.mode = "poll"
+        while not self._stop.wait(self.poll_interval_s):
+            self.changed.set()
+
+    def _run_inotify(self):
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1.0)
+                if not ready:
+                    continue
+                try:
+                    while os.read(self._fd, 65536):
+                        pass
+                except BlockingIOError:
+                    pass
+                self.changed.set()
+                if not os.path.isdir(self.folder):
+                    return  # karta vyjmuta – sledování zaniklo, dál se dotazujeme
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def stop(self):
+        self._stop.set()
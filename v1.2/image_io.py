@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Načítání fotek ze zdroje.
+JPEG se dekóduje rovnou ve zmenšeném měřítku (1/2, 1/4, 1/8) přes DCT škálování,
+plné rozlišení se čte jen tehdy, když zmenšený snímek nestačí na výsledný ořez.
+"""
+import time
+import cv2
+import numpy as np
+from PIL import Image
+
+from detect_cache import CachedDetection, DetectionCache
+from face_detect import (DETECT_CHAIN, Detection, FacePrior, crop_region, detect_face_chain, rotate_image,
+                         square_crop_region)
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def read_long_side(path: str) -> int | None:
+    """Delší strana snímku z hlavičky souboru, bez dekódování pixelů."""
+    try:
+        with Image.open(path) as im:
+            if im.format != "JPEG":
+                return None
+            return max(im.size)
+    except OSError:
+        return None
+
+
+def choose_scale(long_side: int, min_long_side: int) -> int:
+    """Největší měřítko, po kterém má snímek delší stranu aspoň min_long_side."""
+    if not min_long_side:
+        return 1
+    for scale in (8, 4, 2):
+        if long_side // scale >= min_long_side:
+            return scale
+    return 1
+
+
+def load_scaled(path: str, min_long_side: int) -> tuple[np.ndarray | None, int]:
+    """Načte snímek v nejmenším měřítku, které ještě pokryje min_long_side."""
+    long_side = read_long_side(path)
+    scale = choose_scale(long_side, min_long_side) if long_side else 1
+    return cv2.imread(path, REDUCED_FLAGS[scale]), scale
+
+
+def crop_face_from_file(path: str,
+                        max_side: int = 0,
+                        refine: bool = True,
+                        reduced: bool = True,
+                        cache: DetectionCache | None = None,
+                        chain: tuple[str, ...] | list[str] = DETECT_CHAIN,
+                        budget_ms: float = 0,
+                        times: dict[str, float] | None = None,
+                        backend: str = "haar",
+                        prior: FacePrior | None = None) -> tuple[np.ndarray | None, np.ndarray | None, Detection]:
+    """Vrátí (načtený snímek, ořez 125×125, průběh detekce). Snímek je None
+    při chybě načtení, ořez je None, pokud nebyl nalezen obličej. Našel-li
+    obličej stupeň "rotate", je vrácený snímek už otočený.
+    Do times (je-li zadán) se přičtou doby kroků cache/decode/detect/crop v ms."""
+    t0 = t = time.perf_counter()
+    times = {} if times is None else times
+
+    def lap(stage: str):
+        nonlocal t
+        now = time.perf_counter()
+        times[stage] = times.get(stage, 0.0) + (now - t) * 1000
+        t = now
+
+    if cache is not None:
+        hit = cache.lookup(path)
+        lap("cache")
+        if hit is not None:
+            img, crop = _crop_cached(path, hit, max_side, reduced)
+            lap("decode")
+            if img is not None:
+                return img, crop, Detection(hit.face, hit.rotation, "cache" if hit.face else "",
+                                            (time.perf_counter() - t0) * 1000)
+
+    if reduced:
+        img, scale = load_scaled(path, max_side)
+    else:
+        img, scale = cv2.imread(path), 1
+    lap("decode")
+    if img is None:
+        return None, None, Detection(None)
+
+    det = detect_face_chain(img, max_side, refine, chain, budget_ms, backend, prior)
+    lap("detect")
+    face, crop, region = det.face, None, None
+    if face is not None:
+        img = rotate_image(img, det.rotation)
+        region = square_crop_region(face, img.shape[1], img.shape[0])
+        full = None
+        if region[2] < 125 and scale > 1:
+            # zmenšený snímek má na ořez málo pixelů – plné rozlišení jen pro tento případ
+            full = cv2.imread(path)
+        if full is None:
+            crop = crop_region(img, region)
+            region = tuple(v * scale for v in region)
+        else:
+            full = rotate_image(full, det.rotation)
+            region = square_crop_region(tuple(v * scale for v in face), full.shape[1], full.shape[0])
+            crop = crop_region(full, region)
+        face = tuple(v * scale for v in face)
+        lap("crop")
+
+    # nenalezeno jen kvůli časovému limitu – příště to zkusíme znovu
+    if cache is not None and not (face is None and det.exhausted):
+        cache.store(path, face, region, det.rotation)
+    return img, crop, det._replace(face=face, ms=(time.perf_counter() - t0) * 1000)
+
+
+def _crop_cached(path: str, hit: CachedDetection, max_side: int,
+                 reduced: bool) -> tuple[np.ndarray | None, np.ndarray | None]:
+    """Ořez podle uložené oblasti – bez detekce, ale ve stejném měřítku jako
+    crop_face_from_file, aby byl ořez z cache bajtově shodný s původním."""
+    if reduced:
+        img, scale = load_scaled(path, max_side)
+    else:
+        img, scale = cv2.imread(path), 1
+    if img is None or hit.region is None:
+        return img, None
+    img = rotate_image(img, hit.rotation)
+    if hit.region[2] // scale < 125 and scale > 1:
+        full = cv2.imread(path)
+        if full is not None:
+            return img, crop_region(rotate_image(full, hit.rotation), hit.region)
+    return img, crop_region(img, tuple(v // scale for v in hit.region))
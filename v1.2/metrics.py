@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Měření doby jednotlivých kroků (načtení, detekce, karta, zápis…).
+Časy se sčítají do souhrnu pro log a zapisují jako JSON řádky do souboru
+metrik; zápis běží ve vlastním vlákně, aby pomalý N: nebrzdil okno.
+"""
+import json
+import platform
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class Metrics:
+    def __init__(self, path: str | None = None, window: int = 500):
+        self.path = path
+        self.window = window
+        self.host = platform.node()
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._pending = 0   # záznamy od posledního souhrnu
+        self._lines = queue.Queue()
+        self._thread = None
+        if path:
+            self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+            self._thread.start()
+
+    def record(self, op: str, name: str, times: dict[str, float]):
+        """Uloží časy (ms) jedné operace, např. record("load", "IMG_0001.JPG", {"decode": 31.2})."""
+        if not times:
+            return
+        with self._lock:
+            for stage, ms in times.items():
+                samples = self._samples.get((op, stage))
+                if samples is None:
+                    samples = self._samples[(op, stage)] = deque(maxlen=self.window)
+                samples.append(ms)
+            self._pending += 1
+        if self._thread is not None:
+            self._lines.put({
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "host": self.host,
+                "op": op,
+                "file": name,
+                "ms": {stage: round(ms, 2) for stage, ms in times.items()},
+            })
+
+    def summary(self, reset: bool = True) -> list[str]:
+        """Řádky do logu: průměr, p90 a maximum každého kroku za posledních `window` záznamů."""
+        with self._lock:
+            if reset:
+                self._pending = 0
+            items = [(key, np.asarray(values)) for key, values in self._samples.items()]
+        lines = []
+        ops = sorted({op for (op, _), _ in items})
+        for op in ops:
+            parts = []
+            for (o, stage), values in items:
+                if o == op:
+                    parts.append(f"{stage} ⌀{values.mean():.1f}/p90 {np.percentile(values, 90):.1f}/"
+                                 f"max {values.max():.1f}")
+            count = max(len(values) for (o, _), values in items if o == op)
+            lines.append(f"[ČAS] {op} ({count}×, ms): " + ", ".join(parts))
+        return lines
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _run(self):
+        while True:
+            batch = [self._lines.get()]
+            try:
+                while True:
+                    batch.append(self._lines.get_nowait())
+            except queue.Empty:
+                pass
+            stop = None in batch
+            batch = [line for line in batch if line is not None]
+            if batch:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in batch))
+                except OSError:
+                    self.write_errors += 1  # metriky nejsou důležitější než práce obsluhy
+            if stop:
+                return
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._lines.put(None)
+            self._thread.join(timeout)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Zápis výstupů na síťový disk na pozadí.
+Obrázky se kódují ve vláknech podle nastavení výstupu, soubor se zapíše do
+dočasného souboru a atomicky přejmenuje, přechodné chyby sdílené složky se
+opakují. Soubor se stejným obsahem, jaký už na N: je, se nepřepisuje.
+Obsluha mezitím pokračuje další fotkou.
+"""
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import cv2
+import numpy as np
+
+# nastavení kodéru pro jeden výstup (crop_encoding / card_encoding v config.json)
+DEFAULT_ENCODING = {
+    "format": "",            # "" = podle přípony souboru, jinak png / jpg / webp
+    "png_compression": 3,    # 0–9; vyšší úroveň ušetří jen pár procent za mnohem delší čas
+    "jpeg_quality": 95,
+    "webp_quality": 90,      # nad 100 bezztrátově
+}
+
+
+def output_path(path: str, encoding: dict | None) -> str:
+    """Cesta s příponou podle nastaveného formátu výstupu."""
+    fmt = (encoding or {}).get("format")
+    return os.path.splitext(path)[0] + "." + fmt.lower().lstrip(".") if fmt else path
+
+
+def encode_params(ext: str, encoding: dict | None) -> list[int]:
+    settings = {**DEFAULT_ENCODING, **(encoding or {})}
+    ext = ext.lower()
+    if ext == ".png":
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(settings["png_compression"])]
+    if ext in (".jpg", ".jpeg"):
+        return [cv2.IMWRITE_JPEG_QUALITY, int(settings["jpeg_quality"])]
+    if ext == ".webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(settings["webp_quality"])]
+    return []
+
+
+def encode_image(path: str, img: np.ndarray, encoding: dict | None = None) -> bytes:
+    ext = os.path.splitext(path)[1] or ".png"
+    ok, buf = cv2.imencode(ext, img, encode_params(ext, encoding))
+    if not ok:
+        raise ValueError(f"Nelze zakódovat obrázek: {path}")
+    return buf.tobytes()
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# cesta -> (velikost, mtime_ns, otisk) souborů, které tento proces zapsal nebo ověřil
+_known: dict[str, tuple[int, int, bytes]] = {}
+_known_lock = threading.Lock()
+
+
+def unchanged_on_disk(path: str, data: bytes, digest: bytes | None = None) -> bool:
+    """Má soubor na disku přesně tento obsah?
+
+    Stačí stat: jiná velikost znamená změnu a u souboru, který jsme sami
+    zapsali (stejná velikost i mtime), známe jeho otisk. Jinak se soubor
+    stejné velikosti přečte a porovná – čtení je na N: levnější než zápis.
+    """
+    digest = digest or _digest(data)
+    try:
+        st = os.stat(path)
+        if st.st_size != len(data):
+            return False
+        with _known_lock:
+            known = _known.get(path)
+        if known is None or known[:2] != (st.st_size, st.st_mtime_ns):
+            with open(path, "rb") as f:
+                known = (st.st_size, st.st_mtime_ns, _digest(f.read()))
+            with _known_lock:
+                _known[path] = known
+    except OSError:
+        return False
+    return known[2] == digest
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Zapíše soubor, jen pokud se liší od toho na disku; vrací True, když zapisoval."""
+    digest = _digest(data)
+    if unchanged_on_disk(path, data, digest):
+        return False
+    write_atomic(path, data)
+    try:
+        st = os.stat(path)
+        with _known_lock:
+            _known[path] = (st.st_size, st.st_mtime_ns, digest)
+    except OSError:
+        pass
+    return True
+
+
+def write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AsyncWriter:
+    """Kódování běží paralelně v encode_workers vláknech, zápis na N: v jednom
+    vlákně v pořadí odevzdání."""
+
+    def __init__(self, retries: int = 4, backoff_s: float = 0.5, encode_workers: int = 2):
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.pending = 0
+        self.written = 0
+        self.skipped = 0   # obsah se nezměnil, soubor se nepřepisoval
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._encoder = ThreadPoolExecutor(max_workers=max(1, encode_workers), thread_name_prefix="encode")
+        self._jobs = queue.Queue()
+        self._events = queue.Queue()   # (stav, cesta, zpráva, časy v ms) pro hlavní vlákno
+        self._thread = threading.Thread(target=self._run, name="writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str, img: np.ndarray, encoding: dict | None = None):
+        with self._lock:
+            self.pending += 1
+        self._jobs.put((path, self._encoder.submit(self._encode, path, img, encoding)))
+
+    @staticmethod
+    def _encode(path: str, img: np.ndarray, encoding: dict | None) -> tuple[bytes, float]:
+        t0 = time.perf_counter()
+        data = encode_image(path, img, encoding)
+        return data, (time.perf_counter() - t0) * 1000
+
+    def events(self) -> list[tuple[str, str, str, dict[str, float]]]:
+        """Dokončené a neúspěšné zápisy od posledního volání (pro log v Tk)."""
+        out = []
+        try:
+            while True:
+                out.append(self._events.get_nowait())
+        except queue.Empty:
+            return out
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            path, encoded = job
+            times = {}
+            try:
+                status = "ok" if self._write(path, encoded, times) else "skipped"
+                message = ""
+            except Exception as e:
+                status, message = "failed", str(e)
+            with self._lock:
+                self.pending -= 1
+                if status == "ok":
+                    self.written += 1
+                elif status == "skipped":
+                    self.skipped += 1
+                else:
+                    self.failed += 1
+            self._events.put((status, path, message, times))
+            self._jobs.task_done()
+
+    def _write(self, path: str, encoded: Future, times: dict[str, float]) -> bool:
+        data, times["encode"] = encoded.result()
+        t1 = time.perf_counter()
+        delay = self.backoff_s
+        for attempt in range(self.retries + 1):
+            try:
+                written = write_if_changed(path, data)
+                times["write"] = (time.perf_counter() - t1) * 1000  # včetně porovnání a čekání mezi pokusy
+                return written
+            except OSError:
+                # N: bývá krátce nedostupný (VPN, SMB) – zkusíme to znovu
+                if attempt == self.retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Počká na dokončení fronty; vrací False, pokud vypršel čas."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self.pending == 0:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def close(self, timeout: float | None = None) -> bool:
+        flushed = self.flush(timeout)
+        self._jobs.put(None)
+        self._encoder.shutdown(wait=False)
+        return flushed
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Předzpracování dalších fotek ve frontě na pozadí.
+Výsledky (snímek, ořez) drží omezená LRU cache podle cesty a mtime souboru.
+Fronta je prioritní: fotka, na kterou obsluha čeká, jde před předběžné
+načítání, a úlohy mimo aktuální okno dopředu se při přechodu zruší – kromě
+úloh na pozadí (nové soubory ve složce), které doběhnou s nejnižší prioritou.
+"""
+import heapq
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+import numpy as np
+
+
+def file_key(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+# === LRU cache s limitem paměti ===
+class LRUCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.used_bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, (_, dropped) = self._items.popitem(last=False)
+                self.used_bytes -= dropped
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+# === Prefetch ve vláknech ===
+class Prefetcher:
+    def __init__(self, load: Callable[[str], object], workers: int = 2, max_bytes: int = 256 * 1024 * 1024):
+        self._load = load
+        self._cond = threading.Condition()
+        self._heap: list[tuple[int, int, tuple, str]] = []   # (priorita, pořadí, klíč, cesta)
+        self._queued: dict[tuple, int] = {}     # klíč -> priorita úlohy, která ještě neběží
+        self._pending: dict[tuple, Future] = {}  # čekající i běžící úlohy
+        self._background: set[tuple] = set()     # čekající úlohy, které focus() neruší
+        self._seq = itertools.count()
+        self._closed = False
+        self.cancelled = 0
+        self.cache = LRUCache(max_bytes)
+        self._threads = [threading.Thread(target=self._worker, name=f"prefetch-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def request(self, path: str, priority: int = 0, background: bool = False) -> Future:
+        """Future s výsledkem pro path; hotový, pokud je v cache. Menší priorita jde dřív.
+        Úlohu s background nezruší focus()."""
+        key = file_key(path)
+        if key is not None:
+            value = self.cache.get(key)
+            if value is not None:
+                done = Future()
+                done.set_result(value)
+                return done
+        slot = key if key is not None else (path,)
+        with self._cond:
+            future = self._pending.get(slot)
+            if future is None:
+                future = self._pending[slot] = Future()
+                self._push(slot, path, priority)
+                if background:
+                    self._background.add(slot)
+            elif slot in self._queued and priority < self._queued[slot]:
+                self._push(slot, path, priority)  # původní položka haldy se při vyzvednutí přeskočí
+            return future
+
+    def prefetch(self, paths: list[str], start: int = 1, background: bool = False):
+        """Předběžné načtení v pořadí seznamu s prioritami start, start + 1, …"""
+        for i, path in enumerate(paths):
+            self.request(path, start + i, background)
+
+    def focus(self, path: str, ahead: list[str]) -> Future:
+        """Fotka, na kterou obsluha čeká, přednostně, za ní ahead; ostatní
+        dosud nespuštěné úlohy se zruší, aby ji nezdržovaly."""
+        keep = {file_key(p) or (p,) for p in [path, *ahead]}
+        with self._cond:
+            for slot in [slot for slot in self._queued if slot not in keep and slot not in self._background]:
+                del self._queued[slot]
+                self._pending.pop(slot).cancel()
+                self.cancelled += 1
+        future = self.request(path, 0)
+        self.prefetch(ahead)
+        return future
+
+    def _push(self, slot: tuple, path: str, priority: int):
+        self._queued[slot] = priority
+        heapq.heappush(self._heap, (priority, next(self._seq), slot, path))
+        self._cond.notify()
+
+    def _next(self) -> tuple[tuple, str, Future] | None:
+        with self._cond:
+            while not self._closed:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                priority, _, slot, path = heapq.heappop(self._heap)
+                if self._queued.get(slot) != priority:
+                    continue  # zrušeno nebo přeřazeno s vyšší prioritou
+                del self._queued[slot]
+                self._background.discard(slot)
+                future = self._pending[slot]
+                if future.set_running_or_notify_cancel():
+                    return slot, path, future
+            return None
+
+    def _worker(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            slot, path, future = job
+            try:
+                value = self._load(path)
+                if len(slot) > 1:  # klíč z file_key, ne jen cesta nedostupného souboru
+                    self.cache.put(slot, value)
+                future.set_result(value)
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._pending.pop(slot, None)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            for slot in self._queued:
+                self._pending.pop(slot).cancel()
+            self._queued.clear()
+            self._background.clear()
+            self._cond.notify_all()
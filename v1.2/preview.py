@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Plánovač náhledu karty: sloučí rychlé série událostí (debounce), vykresluje
+ve vlákně na pozadí a do Tk předá jen výsledek posledního stavu formuláře.
+"""
+import threading
+import tkinter as tk
+from typing import Callable
+
+
+class PreviewScheduler:
+    def __init__(self,
+                 root: tk.Misc,
+                 render: Callable[[object], object],
+                 on_result: Callable[[object], None],
+                 on_error: Callable[[Exception], None] | None = None,
+                 debounce_ms: int = 60,
+                 poll_ms: int = 10):
+        self.root = root
+        self.render = render
+        self.on_result = on_result
+        self.on_error = on_error
+        self.debounce_ms = debounce_ms
+        self.poll_ms = poll_ms
+
+        self.requested = 0
+        self.rendered = 0
+        self.skipped = 0
+
+        self._generation = 0
+        self._after_id = None
+        self._polling = False
+        self._cond = threading.Condition()
+        self._job = None          # (generace, zadání) čekající na vlákno
+        self._done = None         # (generace, výsledek, chyba) čekající na Tk
+        self._rendering = False   # vlákno právě vykresluje převzaté zadání
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="preview", daemon=True)
+        self._worker.start()
+
+    # --- volá se z Tk vlákna ---
+    def request(self, job):
+        """Naplánuje vykreslení; starší dosud nevykreslená zadání se zahodí."""
+        self.requested += 1
+        self._generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self.skipped += 1
+        self._after_id = self.root.after(self.debounce_ms, self._submit, self._generation, job)
+
+    def cancel(self):
+        """Zneplatní rozpracovaný náhled (např. při přechodu na fotku bez ořezu)."""
+        self._generation += 1
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+            self.skipped += 1
+
+    def _submit(self, generation: int, job):
+        self._after_id = None
+        with self._cond:
+            if self._job is not None:
+                self.skipped += 1
+            self._job = (generation, job)
+            self._cond.notify()
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        with self._cond:
+            done, self._done = self._done, None
+            # dokud něco čeká nebo se vykresluje, výsledek teprve přijde
+            busy = self._job is not None or self._rendering
+        if done is not None:
+            generation, result, error = done
+            if generation != self._generation:
+                self.skipped += 1
+            elif error is not None:
+                if self.on_error is not None:
+                    self.on_error(error)
+            else:
+                self.on_result(result)
+        if busy:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    # --- vlákno náhledu ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._job is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, job = self._job
+                self._job = None
+                self._rendering = True
+            result, error = None, None
+            fresh = generation == self._generation
+            if fresh:
+                try:
+                    result = self.render(job)
+                except Exception as e:
+                    error = e
+            # zastaralé zadání se nevykresluje, Tk ho jen započítá jako přeskočené
+            with self._cond:
+                if fresh:
+                    self.rendered += 1
+                if self._done is not None:
+                    self.skipped += 1
+                self._done = (generation, result, error)
+                self._rendering = False
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Sestavení hotových ID karet na archy A4 pro tisk (PNG + vícestránkové PDF).
+Karty se vkládají řezy do předem alokovaného pole stránky, s ořezovými značkami.
+
+Použití:
+    python print_sheet.py N:/HR/HR/Foto_zamestnancu/hotove_ID_karty --out archy --dpi 300
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple
+import cv2
+import numpy as np
+
+A4_MM = (210.0, 297.0)
+CARD_MM = (85.6, 54.0)  # ID-1
+
+
+def mm_to_px(mm: float, dpi: int) -> int:
+    return int(round(mm / 25.4 * dpi))
+
+
+class SheetLayout(NamedTuple):
+    dpi: int
+    page_w: int
+    page_h: int
+    card_w: int
+    card_h: int
+    slots: list[tuple[int, int]]   # levé horní rohy karet na stránce
+    mark_len: int
+    mark_gap: int
+    line: int
+
+
+def sheet_layout(dpi: int = 300, margin_mm: float = 10.0, gap_mm: float = 4.0) -> SheetLayout:
+    page_w, page_h = mm_to_px(A4_MM[0], dpi), mm_to_px(A4_MM[1], dpi)
+    card_w, card_h = mm_to_px(CARD_MM[0], dpi), mm_to_px(CARD_MM[1], dpi)
+    margin, gap = mm_to_px(margin_mm, dpi), mm_to_px(gap_mm, dpi)
+
+    cols = max(1, (page_w - 2 * margin + gap) // (card_w + gap))
+    rows = max(1, (page_h - 2 * margin + gap) // (card_h + gap))
+    # mřížku vycentrujeme na stránce
+    left = (page_w - (cols * card_w + (cols - 1) * gap)) // 2
+    top = (page_h - (rows * card_h + (rows - 1) * gap)) // 2
+    slots = [(left + c * (card_w + gap), top + r * (card_h + gap)) for r in range(rows) for c in range(cols)]
+    return SheetLayout(dpi, page_w, page_h, card_w, card_h, slots,
+                       mark_len=mm_to_px(3.0, dpi), mark_gap=mm_to_px(1.0, dpi), line=max(1, dpi // 150))
+
+
+def _draw_cut_marks(page: np.ndarray, layout: SheetLayout, x: int, y: int):
+    """Značky v rozích karty, vně karty; karty se vkládají až po značkách a překryjí je."""
+    L, g, t = layout.mark_len, layout.mark_gap, layout.line
+    h, w = page.shape[:2]
+    for cx in (x, x + layout.card_w - t):
+        for y0, y1 in ((y - g - L, y - g), (y + layout.card_h + g, y + layout.card_h + g + L)):
+            page[max(y0, 0):min(y1, h), cx:cx + t] = 0
+    for cy in (y, y + layout.card_h - t):
+        for x0, x1 in ((x - g - L, x - g), (x + layout.card_w + g, x + layout.card_w + g + L)):
+            page[cy:cy + t, max(x0, 0):min(x1, w)] = 0
+
+
+def compose_sheets(cards: Iterable[np.ndarray], layout: SheetLayout, cut_marks: bool = True) -> Iterator[np.ndarray]:
+    """Vrací stránky (BGR) s kartami v daném pořadí."""
+    blank = np.full((layout.page_h, layout.page_w, 3), 255, np.uint8)
+    per_page = len(layout.slots)
+    batch: list[np.ndarray] = []
+
+    def build(batch_cards: list[np.ndarray]) -> np.ndarray:
+        page = blank.copy()
+        if cut_marks:
+            for x, y in layout.slots[:len(batch_cards)]:
+                _draw_cut_marks(page, layout, x, y)
+        for (x, y), card in zip(layout.slots, batch_cards):
+            page[y:y + layout.card_h, x:x + layout.card_w] = card
+        return page
+
+    for card in cards:
+        if card.ndim == 2:
+            card = cv2.cvtColor(card, cv2.COLOR_GRAY2BGR)
+        elif card.shape[2] == 4:
+            card = cv2.cvtColor(card, cv2.COLOR_BGRA2BGR)
+        upscale = card.shape[1] < layout.card_w
+        batch.append(cv2.resize(card, (layout.card_w, layout.card_h),
+                                interpolation=cv2.INTER_CUBIC if upscale else cv2.INTER_AREA))
+        if len(batch) == per_page:
+            yield build(batch)
+            batch = []
+    if batch:
+        yield build(batch)
+
+
+class PdfWriter:
+    """Minimální PDF s jednou JPEG stránkou na list; stránky se zapisují
+    průběžně, takže v paměti nikdy není celý dokument."""
+
+    def __init__(self, path: str, dpi: int):
+        self.dpi = dpi
+        self._f = open(path, "wb")
+        self._offsets: dict[int, int] = {}
+        self._pages: list[int] = []
+        self._next_id = 3  # 1 = katalog, 2 = strom stránek
+        self._f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _obj(self, obj_id: int, body: bytes, stream: bytes | None = None):
+        self._offsets[obj_id] = self._f.tell()
+        self._f.write(b"%d 0 obj\n" % obj_id + body)
+        if stream is not None:
+            self._f.write(b"\nstream\n" + stream + b"\nendstream")
+        self._f.write(b"\nendobj\n")
+
+    def add_page(self, page: np.ndarray, quality: int = 92):
+        ok, jpeg = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Nelze zakódovat stránku do JPEG")
+        h, w = page.shape[:2]
+        pt_w, pt_h = w * 72.0 / self.dpi, h * 72.0 / self.dpi
+        img_id, content_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+        self._obj(img_id, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                          b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>" % (w, h, len(jpeg)), jpeg.tobytes())
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (pt_w, pt_h)
+        self._obj(content_id, b"<< /Length %d >>" % len(content), content)
+        self._obj(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                           b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                  % (pt_w, pt_h, img_id, content_id))
+        self._pages.append(page_id)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        self._obj(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        self._obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self._f.tell()
+        size = self._next_id
+        self._f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        for obj_id in range(1, size):
+            self._f.write(b"%010d 00000 n \n" % self._offsets[obj_id])
+        self._f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+        self._f.close()
+
+
+def write_sheets(pages: Iterable[np.ndarray], out_dir: str, dpi: int,
+                 basename: str = "arch", pdf: bool = True) -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    written: list[str] = []
+    pdf_path = os.path.join(out_dir, f"{basename}.pdf")
+    pdf_writer = PdfWriter(pdf_path, dpi) if pdf else None
+    # kódování PNG uvolňuje GIL – stránky se zapisují souběžně s PDF
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = []
+        for i, page in enumerate(pages, 1):
+            path = os.path.join(out_dir, f"{basename}_{i:03d}.png")
+            if len(futures) >= 8:
+                futures.pop(0).result()  # v paměti držíme jen pár stránek
+            futures.append(pool.submit(cv2.imwrite, path, page, [cv2.IMWRITE_PNG_COMPRESSION, 1]))
+            written.append(path)
+            if pdf_writer is not None:
+                pdf_writer.add_page(page)
+        for future in futures:
+            future.result()
+    if pdf_writer is not None:
+        pdf_writer.close()
+        written.append(pdf_path)
+    return written
+
+
+def collect_card_files(inputs: list[str]) -> list[str]:
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(os.path.join(item, f) for f in sorted(os.listdir(item))
+                         if f.lower().endswith(("_id.png", "_id.jpg")))
+        else:
+            files.append(item)
+    return files
+
+
+def load_cards(files: list[str]) -> Iterator[np.ndarray]:
+    for path in files:
+        card = cv2.imread(path, cv2.IMREAD_COLOR)
+        if card is None:
+            print(f"[WARN] Nelze načíst: {path}")
+            continue
+        yield card
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Sestavení ID karet na archy A4 pro tisk.")
+    parser.add_argument("inputs", nargs="+", help="soubory karet nebo složky s *_ID.png")
+    parser.add_argument("--out", default="archy", help="výstupní složka")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--margin", type=float, default=10.0, help="okraj stránky v mm")
+    parser.add_argument("--gap", type=float, default=4.0, help="mezera mezi kartami v mm")
+    parser.add_argument("--no-marks", action="store_true", help="bez ořezových značek")
+    parser.add_argument("--no-pdf", action="store_true", help="jen PNG stránky")
+    args = parser.parse_args(argv)
+
+    files = collect_card_files(args.inputs)
+    if not files:
+        print("[WARN] Žádné karty k tisku")
+        return 1
+    layout = sheet_layout(args.dpi, args.margin, args.gap)
+    pages = compose_sheets(load_cards(files), layout, not args.no_marks)
+    written = write_sheets(pages, args.out, args.dpi, pdf=not args.no_pdf)
+    print(f"[OK] {len(files)} karet, {len(layout.slots)} na arch → {len(written)} souborů v {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Seznam zaměstnanců z exportu HR (CSV nebo XLSX).
+Index podle osobního čísla a seřazený seznam příjmení pro vyhledávání podle
+začátku – pár napsaných znaků stačí na vyplnění celého formuláře. Načtený
+export se uloží jako kompaktní JSON v profilu uživatele; dokud se export na N:
+nezmění (velikost a mtime), další start čte jen tuto kopii. Bez N: platí
+poslední kopie.
+"""
+import json
+import os
+import unicodedata
+from bisect import bisect_left
+from typing import NamedTuple
+
+from table_io import read_csv
+
+CACHE_VERSION = 2
+
+
+class Employee(NamedTuple):
+    personal_number: str
+    name: str
+    surname: str
+    department: str
+    position: str
+
+
+# záhlaví exportu po fold(): anglické názvy jako v dávkovém manifestu i české z HR systému
+COLUMNS = {
+    "personal_number": ("personalnumber", "osobnicislo", "oscislo", "oc", "cislozamestnance"),
+    "name": ("name", "jmeno", "krestnijmeno"),
+    "surname": ("surname", "prijmeni"),
+    "department": ("department", "oddeleni", "utvar", "pracoviste", "stredisko"),
+    "position": ("position", "pozice", "pracovnipozice", "funkce"),
+}
+
+
+def fold(text: str) -> str:
+    """Malá písmena bez diakritiky – "Nováková" i "novakova" se najdou stejně."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _cell(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel vrací osobní číslo 1234 jako 1234.0
+    return "" if value is None else str(value).strip()
+
+
+def _read_xlsx(path: str) -> list[list[str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ValueError("export XLSX vyžaduje balíček openpyxl (pip install openpyxl)") from e
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return [[_cell(v) for v in row] for row in wb.active.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+def read_export(path: str) -> list[Employee]:
+    """Řádky exportu; první řádek je záhlaví, řádky bez osobního čísla se vynechají."""
+    rows = _read_xlsx(path) if path.lower().endswith((".xlsx", ".xlsm")) else read_csv(path)
+    if not rows:
+        return []
+    header = ["".join(ch for ch in fold(h) if ch.isalnum()) for h in rows[0]]
+    index = {}
+    for field, aliases in COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                index[field] = header.index(alias)
+                break
+    missing = [field for field in ("personal_number", "surname") if field not in index]
+    if missing:
+        raise ValueError(f"v exportu chybí sloupce: {', '.join(missing)}")
+    out = []
+    for row in rows[1:]:
+        values = {field: _cell(row[i]) if i < len(row) else "" for field, i in index.items()}
+        if values["personal_number"]:
+            out.append(Employee(**{field: values.get(field, "") for field in Employee._fields}))
+    return out
+
+
+class Roster:
+    def __init__(self, employees: list[Employee], surnames: list[str] | None = None):
+        """surnames = fold() příjmení již seřazených zaměstnanců (z kopie), jinak se řadí zde."""
+        # pozdější řádek se stejným osobním číslem přepíše dřívější
+        self.by_number: dict[str, Employee] = {e.personal_number: e for e in employees}
+        if surnames is None:
+            self.employees = sorted(self.by_number.values(), key=lambda e: (fold(e.surname), fold(e.name)))
+            surnames = [fold(e.surname) for e in self.employees]
+        else:
+            self.employees = employees
+        self._surnames = surnames
+        self._numbers = sorted(self.by_number)
+        self.from_cache = False
+        self.stale = False   # export na N: nebyl dostupný, platí poslední kopie
+
+    def __len__(self) -> int:
+        return len(self.employees)
+
+    def lookup(self, personal_number: str) -> Employee | None:
+        return self.by_number.get(personal_number.strip())
+
+    def search(self, text: str, limit: int = 10) -> list[Employee]:
+        """Zaměstnanci podle začátku osobního čísla, nebo příjmení a případně jména ("nov ja")."""
+        words = fold(text).split()
+        if not words:
+            return []
+        if words[0].isdigit():
+            i = bisect_left(self._numbers, words[0])
+            out = []
+            while i < len(self._numbers) and self._numbers[i].startswith(words[0]) and len(out) < limit:
+                out.append(self.by_number[self._numbers[i]])
+                i += 1
+            return out
+        surname, rest = words[0], words[1:]
+        i = bisect_left(self._surnames, surname)
+        out = []
+        while i < len(self._surnames) and self._surnames[i].startswith(surname) and len(out) < limit:
+            e = self.employees[i]
+            if all(fold(e.name).startswith(w) for w in rest):
+                out.append(e)
+            i += 1
+        return out
+
+    @classmethod
+    def load(cls, path: str, cache_path: str | None = None) -> "Roster":
+        """Načte export, nebo jeho kopii, pokud se export od posledního načtení nezměnil.
+
+        OSError, když není dostupný export ani kopie; ValueError u nečitelného exportu.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        cached = _read_cache(cache_path, path) if cache_path else None
+        if cached is not None and (st is None or (cached["size"], cached["mtime_ns"]) == (st.st_size, st.st_mtime_ns)):
+            roster = cls([Employee(*row) for row in cached["rows"]], cached["surnames"])
+            roster.from_cache = True
+            roster.stale = st is None
+            return roster
+        if st is None:
+            raise FileNotFoundError(f"export zaměstnanců nedostupný: {path}")
+        roster = cls(read_export(path))
+        if cache_path:
+            _write_cache(cache_path, path, st, roster)
+        return roster
+
+
+def _read_cache(cache_path: str, source: str) -> dict | None:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != CACHE_VERSION or cached.get("source") != source:
+        return None
+    if len(cached.get("rows", ())) != len(cached.get("surnames", ())):
+        return None  # nedopsaná nebo ručně upravená kopie
+    return cached
+
+
+def _write_cache(cache_path: str, source: str, st: os.stat_result, roster: Roster):
+    part = f"{cache_path}.{os.getpid()}.part"
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(part, "w", encoding="utf-8") as f:
+            # řádky jako pole bez klíčů – kopie je malá a json.load ji přečte za pár ms
+            json.dump({"version": CACHE_VERSION, "source": source, "size": st.st_size,
+                       "mtime_ns": st.st_mtime_ns, "rows": [list(e) for e in roster.employees],
+                       "surnames": roster._surnames},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(part, cache_path)
+    except OSError:
+        try:
+            os.remove(part)
+        except OSError:
+            pass  # bez kopie se export příště načte znovu
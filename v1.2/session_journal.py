@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Deník zpracování zdrojové složky.
+Každé uložení, přeskočení a chyba zápisu se připíše jako řádek JSON do souboru
+na výstupní straně; po opětovném vložení karty se podle něj pokračuje první
+nezpracovanou fotkou. Do souboru se jen připisuje, platí poslední záznam
+fotky. Zápis a fsync běží ve vlastním vlákně, aby pomalý N: nebrzdil okno.
+"""
+import json
+import os
+import platform
+import queue
+import re
+import threading
+import time
+from typing import NamedTuple
+
+DONE = ("saved", "skipped")   # fotka je vyřízená; "failed" znamená zpracovat znovu
+
+
+def journal_path(journal_dir: str, source: str) -> str:
+    """Jeden deník na zdrojovou složku, např. D:/DCIM/100JLCAM -> D_DCIM_100JLCAM.jsonl."""
+    key = re.sub(r"[^0-9A-Za-z]+", "_", os.path.normpath(source)).strip("_") or "zdroj"
+    return os.path.join(journal_dir, key + ".jsonl")
+
+
+class JournalEntry(NamedTuple):
+    status: str                  # saved / skipped / failed
+    mtime_ns: int                # zdrojový soubor v době záznamu – stejné jméno
+    size: int                    # na nové kartě je jiná fotka
+    outputs: list[str]
+    form: dict
+    ts: str
+
+
+class SessionJournal:
+    def __init__(self, path: str | None):
+        self.path = path
+        self.host = platform.node()
+        self.write_errors = 0
+        self.lost = 0   # záznamy, které se do zavření nepodařilo zapsat
+        self.load_error: OSError | None = None   # deník nešel přečíst (N: nedostupný)
+        self.entries: dict[str, JournalEntry] = {}
+        self._torn = False   # poslední řádek souboru je nedopsaný, první zápis ho ukončí
+        self._lines = queue.Queue()
+        self._thread = None
+        if path:
+            self._load()
+            self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        rec = json.loads(line)
+                        entry = JournalEntry(rec["status"], rec["mtime_ns"], rec["size"],
+                                             rec.get("outputs", []), rec.get("form", {}), rec.get("ts", ""))
+                    except (ValueError, KeyError, TypeError):
+                        continue  # nedopsaný řádek po pádu nebo výpadku N:
+                    self.entries[rec["file"]] = entry
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.load_error = e  # připisovat lze i tak, poslední záznam platí
+
+    def status(self, name: str, stat: tuple[int, int] | None) -> str | None:
+        """Poslední stav fotky; stat je (mtime_ns, velikost) jako ve FolderIndex.entries."""
+        entry = self.entries.get(name)
+        if entry is None or (stat is not None and (entry.mtime_ns, entry.size) != tuple(stat)):
+            return None
+        return entry.status
+
+    def record(self, name: str, status: str, stat: tuple[int, int] | None,
+               outputs: list[str] | tuple = (), form: dict | None = None):
+        mtime_ns, size = stat if stat is not None else (0, 0)
+        entry = JournalEntry(status, mtime_ns, size, list(outputs), dict(form or {}),
+                             time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.entries[name] = entry
+        if self._thread is not None:
+            self._lines.put({"file": name, "host": self.host, **entry._asdict()})
+
+    def _run(self):
+        unwritten = []  # při výpadku N: se záznamy zkusí znovu ve stejném pořadí
+        while True:
+            batch = []
+            try:
+                batch.append(self._lines.get(timeout=2.0 if unwritten else None))
+                while True:
+                    batch.append(self._lines.get_nowait())
+            except queue.Empty:
+                pass
+            stop = None in batch
+            unwritten += [line for line in batch if line is not None]
+            if unwritten:
+                try:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        # nový záznam se nesmí přilepit na nedopsaný řádek, jinak by se ztratily oba
+                        f.write("\n" * self._torn +
+                                "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in unwritten))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    unwritten = []
+                    self._torn = False
+                except OSError:
+                    self.write_errors += 1
+            if stop:
+                self.lost = len(unwritten)
+                return
+
+    def close(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._lines.put(None)
+            self._thread.join(timeout)
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Čtení tabulek CSV z Excelu – dávkový manifest i export zaměstnanců od HR.
+"""
+import csv
+
+
+def read_csv(path: str) -> list[list[str]]:
+    """Řádky CSV včetně záhlaví; prázdné řádky se vynechají.
+
+    Excel ukládá CSV s BOM a v české lokalizaci se středníky, "CSV (oddělený
+    středníkem)" a starší exporty jsou v cp1250. ValueError u jiného kódování.
+    """
+    for encoding in ("utf-8-sig", "cp1250"):
+        try:
+            with open(path, "r", encoding=encoding, newline="") as f:
+                # Sniffer nepozná oddělovač, když vzorek obsahuje prázdné řádky (Excel je přidává na konec)
+                sample = "\n".join(line for line in f.read(4096).splitlines() if line.strip())
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+                except csv.Error:
+                    dialect = csv.excel
+                return [row for row in csv.reader(f, dialect=dialect) if any(cell.strip() for cell in row)]
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"neznámé kódování: {path}")
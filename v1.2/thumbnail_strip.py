@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Virtualizovaný seznam souborů s náhledy.
+Canvas má výšku celého seznamu, ale kreslí jen řádky, které jsou právě vidět,
+takže i několik tisíc fotek na kartě roluje plynule.
+"""
+import os
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Callable
+
+from PIL import ImageTk
+
+from thumbnails import ThumbnailLoader
+
+# značka stavu z deníku vpravo v řádku
+STATUS_MARKS = {
+    "saved": ("✓", "#2e7d32"),
+    "skipped": ("–", "#888888"),
+    "failed": ("✗", "#c62828"),
+}
+
+class ThumbnailStrip(ttk.Frame):
+    def __init__(self,
+                 master: tk.Misc,
+                 folder: str,
+                 loader: ThumbnailLoader,
+                 on_select: Callable[[int], None],
+                 thumb_px: int = 64,
+                 max_images: int = 512,
+                 status: Callable[[str], str | None] | None = None):
+        super().__init__(master)
+        self.folder = folder
+        self.loader = loader
+        self.on_select = on_select
+        self.status = status
+        self.thumb_px = thumb_px
+        self.row_h = thumb_px + 8
+        self.max_images = max_images
+
+        self.items: list[str] = []
+        self.selected = -1
+        self._images: OrderedDict[str, ImageTk.PhotoImage | None] = OrderedDict()
+        self._redraw_id = None
+
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0, yscrollincrement=self.row_h)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self._schedule_redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-e.delta // 120, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+        self.canvas.bind("<Up>", lambda e: self._step(-1))
+        self.canvas.bind("<Down>", lambda e: self._step(1))
+        self.after(30, self._poll)
+
+    # --- obsah seznamu ---
+    def set_items(self, names: list[str]):
+        self.items = list(names)
+        self.selected = -1
+        self._update_height()
+
+    def insert(self, index: int, name: str):
+        self.items.insert(index, name)
+        if 0 <= index <= self.selected:
+            self.selected += 1
+        self._update_height()
+
+    def delete(self, index: int):
+        del self.items[index]
+        if index == self.selected:
+            self.selected = -1
+        elif index < self.selected:
+            self.selected -= 1
+        self._update_height()
+
+    def invalidate(self, name: str):
+        """Soubor se změnil – náhled se vyrobí znovu."""
+        self._images.pop(name, None)
+        self._schedule_redraw()
+
+    def redraw(self):
+        """Změnily se stavy souborů – překreslí viditelné řádky."""
+        self._schedule_redraw()
+
+    def select(self, index: int):
+        self.selected = index
+        self.see(index)
+        self._schedule_redraw()
+
+    def see(self, index: int):
+        if not self.items or index < 0:
+            return
+        first, last = self._visible_range()
+        if index < first or index >= last - 1:
+            self.canvas.yview_moveto(max(0, index - (last - first) // 2) / len(self.items))
+
+    # --- kreslení ---
+    def _update_height(self):
+        self.canvas.configure(scrollregion=(0, 0, 1, len(self.items) * self.row_h))
+        self._schedule_redraw()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_redraw()
+
+    def _schedule_redraw(self):
+        if self._redraw_id is None:
+            self._redraw_id = self.after_idle(self._redraw)
+
+    def _visible_range(self) -> tuple[int, int]:
+        top = int(self.canvas.canvasy(0))
+        height = max(self.canvas.winfo_height(), self.row_h)
+        first = max(0, top // self.row_h)
+        last = min(len(self.items), (top + height) // self.row_h + 1)
+        return first, last
+
+    def _redraw(self):
+        self._redraw_id = None
+        c = self.canvas
+        c.delete("row")
+        first, last = self._visible_range()
+        width = c.winfo_width()
+        px, pad = self.thumb_px, (self.row_h - self.thumb_px) // 2
+        missing = []
+        for i in range(first, last):
+            name = self.items[i]
+            y = i * self.row_h
+            if i == self.selected:
+                c.create_rectangle(0, y, width, y + self.row_h, fill="#cce4f7", outline="", tags="row")
+            if name in self._images:
+                self._images.move_to_end(name)
+                image = self._images[name]
+                if image is not None:
+                    c.create_image(pad + px // 2, y + self.row_h // 2, image=image, tags="row")
+            else:
+                c.create_rectangle(pad, y + pad, pad + px, y + pad + px, fill="#eeeeee", outline="", tags="row")
+                missing.append((abs(i - self.selected) if self.selected >= 0 else i - first, name))
+            c.create_text(px + 2 * pad + 4, y + self.row_h // 2, text=name, anchor="w", tags="row")
+            mark = STATUS_MARKS.get(self.status(name)) if self.status is not None else None
+            if mark is not None:
+                c.create_text(width - 8, y + self.row_h // 2, text=mark[0], fill=mark[1], anchor="e",
+                              font=("Segoe UI", 12, "bold"), tags="row")
+        # nejdřív řádky kolem výběru, pak zbytek viditelné části
+        missing.sort()
+        self.loader.want([os.path.join(self.folder, name) for _, name in missing])
+
+    def _poll(self):
+        changed = False
+        for path, img in self.loader.results():
+            name = os.path.basename(path)
+            self._images[name] = ImageTk.PhotoImage(img) if img is not None else None
+            self._images.move_to_end(name)
+            changed = True
+        while len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+        if changed:
+            self._schedule_redraw()
+        self.after(30, self._poll)
+
+    # --- ovládání ---
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        index = int(self.canvas.canvasy(event.y)) // self.row_h
+        if 0 <= index < len(self.items):
+            self.on_select(index)
+
+    def _step(self, delta: int):
+        if self.items:
+            self.on_select(max(0, min(len(self.items) - 1, self.selected + delta)))
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Náhledy fotek pro seznam souborů.
+Přednostně se použije JPEG náhled, který fotoaparát ukládá do EXIF (IFD1),
+jinak se snímek dekóduje ve zmenšeném měřítku. Hotové náhledy drží SQLite cache.
+"""
+import os
+import queue
+import sqlite3
+import struct
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from image_io import load_scaled
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    path     TEXT    NOT NULL,
+    px       INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    data     BLOB    NOT NULL,
+    PRIMARY KEY (path, px)
+);
+"""
+
+TAG_ORIENTATION = 0x0112
+TAG_JPEG_OFFSET = 0x0201
+TAG_JPEG_LENGTH = 0x0202
+
+
+# === EXIF náhled ===
+def _ifd(tiff: bytes, order: str, offset: int) -> tuple[dict[int, int], int]:
+    """Číselné hodnoty položek jednoho IFD a offset dalšího IFD."""
+    count = struct.unpack_from(order + "H", tiff, offset)[0]
+    values = {}
+    for i in range(count):
+        tag, typ, _ = struct.unpack_from(order + "HHI", tiff, offset + 2 + 12 * i)
+        if typ == 3:    # SHORT
+            values[tag] = struct.unpack_from(order + "H", tiff, offset + 10 + 12 * i)[0]
+        elif typ == 4:  # LONG
+            values[tag] = struct.unpack_from(order + "I", tiff, offset + 10 + 12 * i)[0]
+    next_ifd = struct.unpack_from(order + "I", tiff, offset + 2 + 12 * count)[0]
+    return values, next_ifd
+
+
+def _parse_exif(tiff: bytes) -> tuple[bytes | None, int]:
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        return None, 1
+    ifd0, ifd1 = _ifd(tiff, order, struct.unpack_from(order + "I", tiff, 4)[0])
+    orientation = ifd0.get(TAG_ORIENTATION, 1)
+    if not ifd1:
+        return None, orientation
+    values, _ = _ifd(tiff, order, ifd1)
+    start, length = values.get(TAG_JPEG_OFFSET), values.get(TAG_JPEG_LENGTH)
+    if not start or not length or start + length > len(tiff):
+        return None, orientation
+    return tiff[start:start + length], orientation
+
+
+def read_exif_thumbnail(path: str) -> tuple[bytes | None, int]:
+    """(JPEG náhled z EXIF nebo None, EXIF orientace). Čte jen hlavičku souboru."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return None, 1
+            while True:
+                head = f.read(4)
+                if len(head) < 4 or head[0] != 0xFF:
+                    return None, 1
+                marker, length = head[1], struct.unpack(">H", head[2:])[0]
+                if marker == 0xE1:
+                    data = f.read(length - 2)
+                    if data[:6] == b"Exif\x00\x00":
+                        return _parse_exif(data[6:])
+                    continue  # XMP apod.
+                if marker in (0xDA, 0xD9):
+                    return None, 1  # začátek obrazových dat – EXIF už nepřijde
+                f.seek(length - 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None, 1
+
+
+def apply_orientation(img: np.ndarray, orientation: int) -> np.ndarray:
+    if orientation == 3:
+        return cv2.rotate(img, cv2.ROTATE_180)
+    if orientation == 6:
+        return cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE)
+    if orientation == 8:
+        return cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return img
+
+
+def make_thumbnail(path: str, px: int) -> np.ndarray | None:
+    """Náhled (BGR) vepsaný do čtverce px×px."""
+    img = None
+    data, orientation = read_exif_thumbnail(path)
+    if data:
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is not None:
+            img = apply_orientation(img, orientation)
+    if img is None or max(img.shape[:2]) < px:
+        img, _ = load_scaled(path, px)  # imread orientaci z EXIF otočí sám
+    if img is None:
+        return None
+    h, w = img.shape[:2]
+    ratio = px / max(h, w)
+    if ratio < 1:
+        img = cv2.resize(img, (max(1, round(w * ratio)), max(1, round(h * ratio))), interpolation=cv2.INTER_AREA)
+    return img
+
+
+# === Trvalá cache ===
+class ThumbnailCache:
+    def __init__(self, db_path: str, px: int):
+        self.db_path = db_path
+        self.px = px
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def lookup(self, path: str) -> bytes | None:
+        try:
+            st = os.stat(path)
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, data FROM thumbnails WHERE path = ? AND px = ?",
+                    (path, self.px)).fetchone()
+        except (OSError, sqlite3.Error):
+            return None
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[2]
+
+    def store(self, path: str, data: bytes):
+        try:
+            st = os.stat(path)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO thumbnails (path, px, size, mtime_ns, data) VALUES (?, ?, ?, ?, ?)",
+                    (path, self.px, st.st_size, st.st_mtime_ns, data))
+                self._dirty = True
+        except (OSError, sqlite3.Error):
+            pass
+
+    def commit(self):
+        """Zápisy se potvrzují po dávkách – commit na N: je drahý."""
+        try:
+            with self._lock:
+                if self._dirty:
+                    self._db.commit()
+                    self._dirty = False
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        self.commit()
+        with self._lock:
+            self._db.close()
+
+
+# === Načítání na pozadí ===
+class ThumbnailLoader:
+    """Vlákna vyrábějí náhledy pro právě viditelné řádky; co obsluha odroluje
+    dřív, než na to přijde řada, se zahodí."""
+
+    def __init__(self, cache: ThumbnailCache | None, px: int, workers: int = 2):
+        self.cache = cache
+        self.px = px
+        self._cond = threading.Condition()
+        self._queue: list[str] = []
+        self._inflight: set[str] = set()
+        self._results = queue.Queue()  # (cesta, PIL obrázek nebo None) pro hlavní vlákno
+        self._closed = False
+        self._threads = [threading.Thread(target=self._run, name=f"thumbs-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        for t in self._threads:
+            t.start()
+
+    def want(self, paths: list[str]):
+        """Nahradí frontu cestami, které jsou teď vidět (v pořadí priority)."""
+        with self._cond:
+            self._queue = [p for p in paths if p not in self._inflight]
+            self._cond.notify_all()
+
+    def results(self) -> list[tuple[str, Image.Image | None]]:
+        out = []
+        try:
+            while True:
+                out.append(self._results.get_nowait())
+        except queue.Empty:
+            return out
+
+    def load(self, path: str) -> Image.Image | None:
+        data = self.cache.lookup(path) if self.cache is not None else None
+        if data is not None:
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        else:
+            img = make_thumbnail(path, self.px)
+            if img is not None and self.cache is not None:
+                ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                if ok:
+                    self.cache.store(path, buf.tobytes())
+        if img is None:
+            return None
+        return Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._queue.pop(0)
+                self._inflight.add(path)
+            try:
+                img = self.load(path)
+            except Exception:
+                img = None
+            with self._cond:
+                self._inflight.discard(path)
+                idle = not self._queue and not self._inflight
+            self._results.put((path, img))
+            if idle and self.cache is not None:
+                self.cache.commit()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()